@@ -1,4 +1,5 @@
 import os
+import hashlib
 
 os.environ["LANG"] = "en_US.UTF-8"
 os.environ["LC_ALL"] = "en_US.UTF-8"
@@ -15,6 +16,9 @@ from sklearn.metrics import classification_report, confusion_matrix, roc_curve,
     recall_score, f1_score
 import time
 
+# CSV schema and loading are shared with the headless scoring tools
+from transactions import FEATURE_COLUMNS, load_dataset
+
 import streamlit as st
 # Animation imports
 import requests
@@ -62,6 +66,72 @@ except Exception:
     benchmark_mod = None
     BENCH_OK = False
 
+try:
+    import quantum_engine as qengine
+    QENGINE_OK = True
+except Exception:
+    qengine = None
+    QENGINE_OK = False
+
+try:
+    import quantum_kernels as qkernels
+    QKERNELS_OK = True
+except Exception:
+    qkernels = None
+    QKERNELS_OK = False
+
+try:
+    import quantum_store as qstore
+    QSTORE_OK = True
+except Exception:
+    qstore = None
+    QSTORE_OK = False
+
+try:
+    from quantum_model import QuantumKernelSVM
+    QMODEL_OK = True
+except Exception:
+    QuantumKernelSVM = None
+    QMODEL_OK = False
+
+try:
+    import model_artifacts as martifacts
+    MART_OK = True
+except Exception:
+    martifacts = None
+    MART_OK = False
+
+# Statevector engine for the feature map: batched NumPy by default, Qiskit as cross-check
+QUANTUM_ENGINE = "numpy" if QENGINE_OK else "qiskit"
+
+# Feature-map register size and RY/CNOT block repetitions (sidebar-configurable)
+DEFAULT_N_QUBITS = 4
+MAX_N_QUBITS = qengine.MAX_QUBITS if QENGINE_OK else 12
+DEFAULT_FEATURE_MAP_REPS = 1
+
+# Worker processes for wide-register simulation (1 keeps everything in-process)
+DEFAULT_SIMULATION_WORKERS = 1
+
+# Threads building kernel tiles concurrently; defaults to every core of the host
+DEFAULT_KERNEL_THREADS = os.cpu_count() or 1
+
+# Statevector / kernel precision: single halves memory and speeds up BLAS
+PRECISION_OPTIONS = {
+    "Double (complex128 / float64)": "double",
+    "Single (complex64 / float32)": "single",
+}
+DEFAULT_PRECISION = "double"
+
+# Quantum kernel construction methods selectable from the sidebar
+QUANTUM_KERNEL_METHODS = {
+    "Fidelity (tiled GEMM)": "gemm",
+    "Fidelity (pairwise loop)": "loop",
+    "Fidelity (out-of-core memmap)": "memmap",
+    "Linear QSVM (explicit density-matrix features)": "linear",
+    "Nyström approximation (n·m)": "nystrom",
+}
+LANDMARK_SAMPLING_OPTIONS = {"Uniform": "uniform", "Stratified by Label": "stratified"}
+
 # Set random seed for reproducibility
 np.random.seed(42)
 
@@ -1186,43 +1256,54 @@ st.markdown("Real-time Statistical Analysis with Classical vs Quantum SVM Compar
 # QUANTUM ENCODING FUNCTIONS - QISKIT QUANTUM CIRCUITS
 # ========================================================================
 
-def quantum_feature_map_qiskit(features):
+def quantum_feature_map_qiskit(features, reps=1):
     """
     Quantum circuit with RY rotations and CNOT entanglement
     Your exact quantum feature map implementation
+    The RY/CNOT block is repeated reps times (reps=1 is the original map)
+    With the engine available, the circuit is bound from a ParameterVector template
+    that is built once per qubit count instead of gate by gate
     """
+    if QENGINE_OK:
+        try:
+            template = qengine.feature_map_template(len(features), reps)
+            return template.assign_parameters(np.asarray(features, dtype=float))
+        except Exception:
+            pass
+
     n_qubits = len(features)
     qc = QuantumCircuit(n_qubits, name='QuantumFeatureMap')
-    
-    # First layer: RY rotations (encode features)
-    for i in range(n_qubits):
-        qc.ry(features[i], i)
-    
-    # First entanglement: linear CNOT chain
-    for i in range(n_qubits - 1):
-        qc.cx(i, i + 1)
-    
-    # Second layer: parametric RY rotations
-    for i in range(n_qubits):
-        qc.ry(features[i] * 0.5, i)
-    
-    # Second entanglement: cyclic CNOT
-    for i in range(n_qubits - 1):
-        qc.cx(i, (i + 1) % n_qubits)
-    
+
+    for _ in range(reps):
+        # First layer: RY rotations (encode features)
+        for i in range(n_qubits):
+            qc.ry(features[i], i)
+
+        # First entanglement: linear CNOT chain
+        for i in range(n_qubits - 1):
+            qc.cx(i, i + 1)
+
+        # Second layer: parametric RY rotations
+        for i in range(n_qubits):
+            qc.ry(features[i] * 0.5, i)
+
+        # Second entanglement: cyclic CNOT
+        for i in range(n_qubits - 1):
+            qc.cx(i, (i + 1) % n_qubits)
+
     return qc
 
 
 def get_expectation_z(qc):
     """
     Calculate Pauli-Z expectation values for each qubit
-    Returns quantum features from the circuit
+    Returns quantum features from the circuit (or an already simulated Statevector)
     """
-    state = Statevector.from_instruction(qc)
+    state = qc if isinstance(qc, Statevector) else Statevector.from_instruction(qc)
     expectations = []
     
-    for i in range(qc.num_qubits):
-        pauli = ['I'] * qc.num_qubits
+    for i in range(state.num_qubits):
+        pauli = ['I'] * state.num_qubits
         pauli[i] = 'Z'
         exp_val = np.real(state.expectation_value(Pauli("".join(pauli))))
         expectations.append(exp_val)
@@ -1230,55 +1311,88 @@ def get_expectation_z(qc):
     return np.array(expectations)
 
 
-def encode_quantum_features(X):
+def encode_quantum_features(X, correlators=False, quantum_states=None, use_cache=True, transaction_ids=None,
+                            n_qubits=DEFAULT_N_QUBITS, reps=DEFAULT_FEATURE_MAP_REPS,
+                            n_workers=DEFAULT_SIMULATION_WORKERS, precision=DEFAULT_PRECISION):
     """
     Convert classical features to quantum-encoded features using Qiskit
     This creates real quantum circuits and extracts Pauli-Z expectation values
+    With the batched engine, correlators=True also appends the <ZZ> pair correlators
+    Pass quantum_states (from prepare_quantum_states) to reuse an existing simulation pass
+    Pass transaction_ids to bulk-load previously seen transactions from the embedding store
+    n_qubits / reps set the register size and feature-map depth
+    n_workers > 1 shards wide registers across processes and only returns the expectations
+    precision="single" simulates in complex64 and returns float32 features
     """
-    if not QUANTUM_OK:
+    if not (QUANTUM_OK or QENGINE_OK):
         print("Qiskit not available, using classical features")
         return X
 
     try:
-        # Normalize features to [0, π] range for quantum gates
-        X_min = np.min(X, axis=0)
-        X_max = np.max(X, axis=0)
-        X_range = X_max - X_min
-        X_range[X_range == 0] = 1  # Avoid division by zero
-        X_norm = (X - X_min) / X_range * np.pi
-
         print(f"🚀 Extracting quantum features from {X.shape[0]} samples...")
 
-        # Ensure consistent qubit count: pad to 4 qubits if needed
-        def pad_features_to_qubits(feat, n_qubits=4):
-            f = np.array(feat, dtype=float)
-            if len(f) < n_qubits:
-                return np.concatenate([f, np.zeros(n_qubits - len(f))])
-            return f[:n_qubits]
-
-        # Encode each sample through quantum circuit and return Pauli-Z expectations
-        quantum_features = []
+        # Simulate all samples at once with the batched engine and evaluate every
+        # observable in one pass over the probability array
         fallback_count = 0
-        for i, features in enumerate(X_norm):
+        quantum_features = None
+        if quantum_states is None and transaction_ids is None and n_workers > 1 and QENGINE_OK \
+                and n_qubits >= qengine.PARALLEL_MIN_QUBITS:
+            # Expectations only: statevectors never leave the worker processes
             try:
-                padded = pad_features_to_qubits(features, n_qubits=4)
-                qc = quantum_feature_map_qiskit(padded)
-                expvals = get_expectation_z(qc)
-                quantum_features.append(expvals)
-
-                if (i + 1) % max(1, len(X_norm) // 10) == 0:  # Progress indicator
-                    print(f"   ✓ Processed {i + 1}/{len(X_norm)} samples")
-            except Exception as circuit_error:
-                print(f"Circuit error for sample {i}: {circuit_error}")
-                quantum_features.append(pad_features_to_qubits(features, n_qubits=4))
-                fallback_count += 1
-
-        quantum_features = np.array(quantum_features)
+                X_norm, X_bounds = qengine.normalize_features(X)
+                X_range = X_bounds[1]
+                quantum_features = qengine.simulate_parallel(qengine.pad_to_qubits(X_norm, n_qubits),
+                                                             n_workers=n_workers, reps=reps, output="expectations",
+                                                             correlators=correlators,
+                                                             dtype=qengine.state_dtype(precision))
+            except Exception as parallel_error:
+                print(f"Parallel simulation failed, simulating in-process: {parallel_error}")
+
+        if quantum_features is None and quantum_states is None:
+            quantum_states = prepare_quantum_states(X, n_qubits=n_qubits, reps=reps, use_cache=use_cache,
+                                                    transaction_ids=transaction_ids, n_workers=n_workers,
+                                                    precision=precision)
+
+        if quantum_features is None and quantum_states is not None:
+            quantum_features = quantum_states.expectations(correlators=correlators)
+            X_range = quantum_states.bounds[1]
+        elif quantum_features is None:
+            # Normalize features to [0, π] range for quantum gates
+            X_min = np.min(X, axis=0)
+            X_max = np.max(X, axis=0)
+            X_range = X_max - X_min
+            X_range[X_range == 0] = 1  # Avoid division by zero
+            X_norm = (X - X_min) / X_range * np.pi
+
+            # Ensure consistent qubit count: pad to n_qubits if needed
+            def pad_features_to_qubits(feat, n_qubits=n_qubits):
+                f = np.array(feat, dtype=float)
+                if len(f) < n_qubits:
+                    return np.concatenate([f, np.zeros(n_qubits - len(f))])
+                return f[:n_qubits]
+
+            # Encode each sample through quantum circuit and return Pauli-Z expectations
+            quantum_features = []
+            for i, features in enumerate(X_norm):
+                try:
+                    padded = pad_features_to_qubits(features, n_qubits=n_qubits)
+                    qc = quantum_feature_map_qiskit(padded, reps=reps)
+                    expvals = get_expectation_z(qc)
+                    quantum_features.append(expvals)
+
+                    if (i + 1) % max(1, len(X_norm) // 10) == 0:  # Progress indicator
+                        print(f"   ✓ Processed {i + 1}/{len(X_norm)} samples")
+                except Exception as circuit_error:
+                    print(f"Circuit error for sample {i}: {circuit_error}")
+                    quantum_features.append(pad_features_to_qubits(features, n_qubits=n_qubits))
+                    fallback_count += 1
+
+            quantum_features = np.array(quantum_features)
 
         # Diagnostics
         print(f" Quantum encoding complete: {X.shape} → {quantum_features.shape}")
         print(f"   X_range min/max: {X_range.min():.6g}/{X_range.max():.6g}")
-        print(f"   Quantum features mean/std per qubit: {quantum_features.mean(axis=0)} / {quantum_features.std(axis=0)}")
+        print(f"   Quantum features mean/std per observable: {quantum_features.mean(axis=0)} / {quantum_features.std(axis=0)}")
         if fallback_count:
             print(f" {fallback_count} samples used fallback classical/padded features")
 
@@ -1294,21 +1408,15 @@ def quantum_kernel_evaluation(X1, X2):
     """
     Compute quantum kernel between two sets of data points using Qiskit
     Uses RBF kernel as fallback for compatibility
+    For circuit lists, returns the rectangular fidelity kernel K(X1, X2)
     """
     # If inputs are lists of QuantumCircuit objects, compute fidelity kernel
     try:
         # detect if X1 is a list/array of QuantumCircuit
         if hasattr(X1, '__len__') and len(X1) > 0 and hasattr(X1[0], 'num_qubits'):
-            svs = [Statevector.from_instruction(qc).data for qc in X1]
-            n = len(svs)
-            K = np.zeros((n, n), dtype=float)
-            for i in range(n):
-                for j in range(i, n):
-                    overlap = np.vdot(svs[i], svs[j])
-                    Kij = np.abs(overlap) ** 2
-                    K[i, j] = Kij
-                    K[j, i] = Kij
-            return K
+            if X2 is None or X2 is X1:
+                return quantum_kernel_state_fidelity(X1)
+            return qkernels.fidelity_kernel(circuit_statevectors(X1), circuit_statevectors(X2))
         # otherwise fall back to RBF on provided numeric features
         from sklearn.metrics.pairwise import rbf_kernel
         return rbf_kernel(X1, X2)
@@ -1317,7 +1425,7 @@ def quantum_kernel_evaluation(X1, X2):
         return np.eye(len(X1))
 
 
-def build_quantum_circuits_from_X(X, n_qubits=4):
+def build_quantum_circuits_from_X(X, n_qubits=DEFAULT_N_QUBITS, reps=DEFAULT_FEATURE_MAP_REPS):
     """Build QuantumCircuit list from numeric dataset X (will normalize and pad)."""
     # Normalize features to [0, pi]
     X_min = np.min(X, axis=0)
@@ -1333,21 +1441,142 @@ def build_quantum_circuits_from_X(X, n_qubits=4):
             padded = np.concatenate([padded, np.zeros(n_qubits - len(padded))])
         else:
             padded = padded[:n_qubits]
-        circuits.append(quantum_feature_map_qiskit(padded))
+        circuits.append(quantum_feature_map_qiskit(padded, reps=reps))
     return circuits
 
 
-def quantum_kernel_state_fidelity(circuits):
-    """Compute kernel matrix using statevector fidelity |<psi_i|psi_j>|^2"""
-    svs = [Statevector.from_instruction(qc).data for qc in circuits]
-    n = len(svs)
-    K = np.zeros((n, n), dtype=float)
-    for i in range(n):
-        for j in range(i, n):
-            overlap = np.vdot(svs[i], svs[j])
-            Kij = np.abs(overlap) ** 2
-            K[i, j] = Kij
-            K[j, i] = Kij
+def prepare_quantum_states(X, n_qubits=DEFAULT_N_QUBITS, engine=None, use_cache=True, transaction_ids=None,
+                           reps=DEFAULT_FEATURE_MAP_REPS, n_workers=DEFAULT_SIMULATION_WORKERS,
+                           precision=DEFAULT_PRECISION, bounds=None):
+    """Normalize, pad and simulate X once with the batched engine.
+
+    Returns a quantum_engine.QuantumStates shared by the expectation features,
+    the fidelity kernel and the enhancement step, or None when the engine is
+    unavailable (callers then fall back to per-circuit Qiskit simulation).
+    With use_cache, statevectors already simulated in this process (e.g. on an
+    earlier Streamlit rerun) are reused from the process-wide LRU cache.
+    With transaction_ids, embeddings persisted by an earlier upload of the same
+    transactions are bulk-loaded from the on-disk store and only new ones simulated.
+    The engine picks a dense batched pass for small registers and a memory-aware
+    per-sample pass (spilling to disk if needed) for large ones, sharded over
+    n_workers processes for wide registers, in the given precision.
+    `bounds` fixes the angle normalisation instead of taking it from X.
+    """
+    if not QENGINE_OK or (engine or QUANTUM_ENGINE) == "qiskit":
+        return None
+    try:
+        cache = qengine.STATEVECTOR_CACHE if use_cache else None
+        quantum_states = None
+        if transaction_ids is not None and QSTORE_OK:
+            try:
+                quantum_states = qstore.EMBEDDING_STORE.prepare_quantum_states(
+                    X, transaction_ids, n_qubits=n_qubits, bounds=bounds, engine=engine or QUANTUM_ENGINE, cache=cache,
+                    reps=reps, n_workers=n_workers, precision=precision)
+                store_stats = qstore.EMBEDDING_STORE.last_stats
+                print(f" Embedding store: {store_stats['loaded']} transactions loaded, "
+                      f"{store_stats['simulated']} simulated ({store_stats['stale']} stale)")
+            except Exception as store_error:
+                print(f" Embedding store unavailable ({store_error}), simulating all rows")
+        if quantum_states is None:
+            quantum_states = qengine.prepare_quantum_states(X, n_qubits=n_qubits, bounds=bounds,
+                                                            engine=engine or QUANTUM_ENGINE, cache=cache, reps=reps,
+                                                            n_workers=n_workers, precision=precision)
+        plan = quantum_states.plan
+        print(f" Simulation plan: {n_qubits} qubits x {reps} reps ({precision} precision), {plan['path']} path, "
+              f"batch {plan['batch_size']}, {plan['total_bytes'] / 1e6:.1f} MB of statevectors"
+              f"{' (spilled to disk)' if plan['out_of_core'] else ''}")
+        return quantum_states
+    except Exception as engine_error:
+        print(f"Batched engine failed, simulating per circuit: {engine_error}")
+        return None
+
+
+def circuit_statevectors(circuits):
+    """Stack the statevectors of a list of QuantumCircuit objects into one array."""
+    return np.array([Statevector.from_instruction(qc).data for qc in circuits])
+
+
+def quantum_kernel_state_fidelity(circuits, method="gemm", tile_size=None, use_cache=False,
+                                  n_jobs=DEFAULT_KERNEL_THREADS, packed=False, transaction_ids=None):
+    """Compute kernel matrix using statevector fidelity |<psi_i|psi_j>|^2
+
+    Accepts a list of QuantumCircuit objects or a precomputed statevector array.
+    method="gemm" stacks the statevectors and builds |S.S^H|^2 in BLAS row tiles;
+    method="loop" keeps the original pairwise np.vdot loop for reference.
+    method="memmap" writes the tiles to a resumable memory-mapped file under
+    static/uploads/kernel_cache and returns a read-only memmap view.
+    use_cache looks the matrix (and, for multi-tile gemm, each tile) up in the
+    content-addressed kernel cache first. The statevectors are fully determined
+    by the data, the normalisation bounds and the feature map, so their hash
+    addresses all three.
+    n_jobs threads compute the upper-triangle tiles of the gemm and memmap builds.
+    With use_cache or packed=True, the gemm build only fills the packed upper
+    triangle, which is what the kernel cache stores; it is expanded to the
+    full matrix on return unless packed=True. Uncached full-matrix builds skip
+    packing entirely.
+    With transaction_ids (one per statevector), the gemm build grows or slices
+    the Gram matrix of the previous selection and only computes the rows of
+    transactions that were not in it.
+    """
+    svs = circuits if isinstance(circuits, np.ndarray) else circuit_statevectors(circuits)
+    tile_size = tile_size or (qkernels.DEFAULT_TILE_SIZE if QKERNELS_OK else 2048)
+
+    if method == "memmap" and QKERNELS_OK:
+        return qkernels.memmap_fidelity_kernel(svs, tile_size=tile_size, n_jobs=n_jobs)
+
+    kernel_cache = qkernels.KERNEL_CACHE if use_cache and QKERNELS_OK else None
+    K_packed = None
+    if kernel_cache is not None:
+        cache_key = kernel_cache.key("fidelity_kernel_packed", method, svs)
+        K_packed = kernel_cache.get(cache_key)
+        if K_packed is not None:
+            n = qkernels.packed_dim(len(K_packed))
+            print(f" Kernel cache hit: reusing {n}x{n} kernel matrix")
+
+    incremental = method == "gemm" and QKERNELS_OK and transaction_ids is not None
+    K = None
+    if K_packed is None:
+        if incremental:
+            K = qkernels.INCREMENTAL_KERNEL.update(transaction_ids, svs, tile_size=tile_size, n_jobs=n_jobs)
+            stats = qkernels.INCREMENTAL_KERNEL.last_stats
+            print(f" Incremental kernel: reused {stats['reused']} rows of the previous selection, "
+                  f"computed {stats['computed']}")
+            if kernel_cache is not None or packed:
+                K_packed = qkernels.pack_upper(K)
+        elif method == "gemm" and QKERNELS_OK and kernel_cache is None and not packed:
+            # Nothing to cache or persist: build the full matrix directly
+            K = qkernels.fidelity_kernel(svs, tile_size=tile_size, n_jobs=n_jobs)
+        elif method == "gemm" and QKERNELS_OK:
+            # Tiles go to their own budget so they cannot evict the finished matrices
+            tile_cache = qkernels.KERNEL_TILE_CACHE if kernel_cache is not None and len(svs) > tile_size else None
+            K_packed = qkernels.fidelity_kernel(svs, tile_size=tile_size, cache=tile_cache, n_jobs=n_jobs,
+                                                packed=True)
+        else:
+            n = len(svs)
+            K = np.zeros((n, n), dtype=float)
+            for i in range(n):
+                for j in range(i, n):
+                    overlap = np.vdot(svs[i], svs[j])
+                    Kij = np.abs(overlap) ** 2
+                    K[i, j] = Kij
+                    K[j, i] = Kij
+            if not QKERNELS_OK:
+                return K
+            if kernel_cache is not None or packed:
+                K_packed = qkernels.pack_upper(K)
+
+        if kernel_cache is not None:
+            try:
+                if not kernel_cache.put(cache_key, K_packed):
+                    print(f" Kernel matrix ({K_packed.nbytes / 1e6:.0f} MB) exceeds the kernel cache cap; not cached")
+            except Exception as cache_error:
+                print(f" Could not cache kernel matrix: {cache_error}")
+    if packed:
+        return K_packed
+    if K is None:
+        K = qkernels.unpack_upper(K_packed)
+        if incremental:
+            qkernels.INCREMENTAL_KERNEL.remember(transaction_ids, svs, K)
     return K
 
 
@@ -1355,24 +1584,8 @@ def quantum_kernel_state_fidelity(circuits):
 # Helper Functions
 # ========================================================================
 
-def encode_time_of_day(col):
-    if col.dtype == object:
-        return col.map({"Day": 0, "Night": 1}).astype(int)
-    return col.astype(int)
-
-
-def load_dataset(path):
-    df = pd.read_csv(path)
-    expected = ["TransactionID", "Amount", "CountryRisk", "TimeOfDay", "SenderBlacklisted", "SenderAgeDays", "Label"]
-    missing = [c for c in expected if c not in df.columns]
-    if missing:
-        raise ValueError(f"CSV missing columns: {missing}. Expected: {expected}")
-    df["TimeOfDay"] = encode_time_of_day(df["TimeOfDay"])
-    return df
-
-
-def build_preprocessor(X):
-    """Enhanced preprocessor"""
+def build_preprocessor(X, n_components=DEFAULT_N_QUBITS):
+    """Enhanced preprocessor (PCA keeps at most n_components, i.e. one per qubit)"""
     try:
         if len(X) < 2:
             raise ValueError("Need at least 2 samples for preprocessing")
@@ -1387,7 +1600,7 @@ def build_preprocessor(X):
             X_scaled = X.values
 
         # PCA with better handling
-        n_components = min(4, X.shape[1], X.shape[0] - 1)
+        n_components = min(n_components, X.shape[1], X.shape[0] - 1)
         if n_components < 1:
             n_components = 1
 
@@ -1402,6 +1615,54 @@ def build_preprocessor(X):
         return None, None, X.values
 
 
+def describe_quantum_fit(quantum_model):
+    """One-line summary of the fitted quantum model's kernel cost, for the dashboard"""
+    report = getattr(quantum_model, "fit_report_", None)
+    if not report:
+        return None
+    text = (f"Quantum kernel ({report['mode']}, {quantum_model.n_qubits} qubits x {quantum_model.reps} reps): "
+            f"kernel {report['kernel_time']:.3f}s, fit {report['fit_time']:.3f}s")
+    if report["mode"] == "nystrom":
+        text += (f", m={report['n_landmarks']} landmarks of {report['n_train']:,} rows, "
+                 f"kernel max error {report['kernel_max_error']:.2e}")
+    elif report["mode"] == "fidelity":
+        text += f", {quantum_model.n_support_vectors_:,}/{report['n_train']:,} support vectors"
+    return text
+
+
+def update_fitted_pipeline(scaler, pca, **models):
+    """Keep the last fitted preprocessing and models in the session, to score or save them without retraining"""
+    if not MART_OK:
+        return
+    pipeline = st.session_state.get("fitted_pipeline")
+    if pipeline is None or pipeline.scaler is not scaler or pipeline.pca is not pca:
+        pipeline = martifacts.FraudPipeline(scaler, pca)
+    for name, model in models.items():
+        if model is not None:
+            setattr(pipeline, name, model)
+    if pipeline.models:
+        st.session_state["fitted_pipeline"] = pipeline
+
+
+def dataset_fingerprint(df):
+    """Content hash of an uploaded dataset, used to key models fitted on all of its rows"""
+    return hashlib.sha1(pd.util.hash_pandas_object(df, index=True).values.tobytes()).hexdigest()[:16]
+
+
+def full_dataset_fit(name, key, fit):
+    """Result of fit() on the whole uploaded dataset, kept in the session until key changes.
+
+    key identifies the dataset and every setting the fit depends on; while it is
+    unchanged, filter changes only subset the stored predictions and probabilities.
+    """
+    fits = st.session_state.setdefault("full_dataset_fits", {})
+    entry = fits.get(name)
+    if entry is None or entry[0] != key:
+        entry = (key, fit())
+        fits[name] = entry
+    return entry[1]
+
+
 def build_classical_svm(X_reduced, y):
     """Enhanced Classical SVM with better error handling"""
     try:
@@ -1437,8 +1698,26 @@ def build_classical_svm(X_reduced, y):
         return None, 0.001, dummy_pred, dummy_proba
 
 
-def build_quantum_svm_enhanced(X_reduced, y):
-    """Enhanced Quantum SVM with REAL quantum circuits and encoding"""
+def build_quantum_svm_enhanced(X_reduced, y, kernel_method="gemm", n_landmarks=200, landmark_sampling="uniform",
+                               use_cache=True, transaction_ids=None, use_kernel_cache=True,
+                               n_qubits=DEFAULT_N_QUBITS, reps=DEFAULT_FEATURE_MAP_REPS,
+                               n_workers=DEFAULT_SIMULATION_WORKERS, kernel_threads=DEFAULT_KERNEL_THREADS,
+                               precision=DEFAULT_PRECISION, kernel_ids=None, bounds=None):
+    """Enhanced Quantum SVM with REAL quantum circuits and encoding
+
+    kernel_method selects how the fidelity kernel is built ("gemm", "loop", "memmap",
+    "linear" or "nystrom"; the latter uses n_landmarks rows picked by landmark_sampling).
+    use_cache reuses statevectors from the process-wide cache across reruns; transaction_ids
+    (one per row) reuses embeddings persisted for those transactions by earlier uploads;
+    use_kernel_cache serves fidelity kernels from the content-addressed disk cache.
+    n_qubits / reps set the feature-map register size and depth; n_workers processes
+    simulate wide registers in parallel and kernel_threads threads build kernel tiles;
+    precision ("double" / "single") sets the statevector, feature and kernel dtype.
+    kernel_ids (TransactionIDs, one per row) let the gemm fidelity kernel reuse the rows of the
+    previous selection; pass fixed `bounds` so that kept rows also keep their statevectors.
+    Returns (y_pred, y_proba, training_time, quantum_model); quantum_model is the fitted
+    QuantumKernelSVM that scores unseen rows, or None when only the fallback paths ran.
+    """
     try:
         if len(X_reduced) < 2:
             raise ValueError("Need at least 2 samples for training")
@@ -1452,7 +1731,7 @@ def build_quantum_svm_enhanced(X_reduced, y):
                 np.where(dummy_pred == 0, 0.85, 0.15),
                 np.where(dummy_pred == 1, 0.85, 0.15)
             ])
-            return dummy_pred, dummy_proba, 0.002
+            return dummy_pred, dummy_proba, 0.002, None
 
         print("\n" + "=" * 60)
         print("🚀 STARTING QUANTUM SVM WITH REAL QUANTUM CIRCUITS")
@@ -1464,35 +1743,108 @@ def build_quantum_svm_enhanced(X_reduced, y):
         # QUANTUM FEATURE ENCODING - REAL QUANTUM CIRCUITS
         # =====================================================================
         print(" Step 1: Converting classical features to quantum states...")
-        quantum_features = encode_quantum_features(X_reduced)
+        # Transaction features are mostly discrete, so many (features, label) rows repeat exactly:
+        # simulate and fit on unique rows only (weighted by their counts), then expand back via inverse
+        y_array = np.asarray(y)
+        if QENGINE_OK:
+            unique_rows, inverse, row_counts = qengine.deduplicate_rows(X_reduced, y_array)
+        else:
+            unique_rows = inverse = np.arange(len(y_array))
+            row_counts = np.ones(len(y_array), dtype=int)
+        X_unique, y_unique = np.asarray(X_reduced)[unique_rows], y_array[unique_rows]
+        if len(unique_rows) < len(y_array):
+            print(f" Deduplicated {len(y_array)} transactions to {len(unique_rows)} unique rows")
+
+        # Single simulation pass: features, kernel and enhancement all read from quantum_states
+        ids_unique = None if transaction_ids is None else np.asarray(transaction_ids)[unique_rows]
+        quantum_states = prepare_quantum_states(X_unique, n_qubits=n_qubits, reps=reps, use_cache=use_cache,
+                                                transaction_ids=ids_unique, n_workers=n_workers,
+                                                precision=precision, bounds=bounds)
+        if use_cache and quantum_states is not None:
+            cache_stats = qengine.STATEVECTOR_CACHE.stats()
+            print(f" Statevector cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses, "
+                  f"{cache_stats['entries']} entries")
+        quantum_features = encode_quantum_features(X_unique, quantum_states=quantum_states)[inverse]
 
         print(f"Step 2: Building quantum kernel matrix...")
         # Use a fidelity-based quantum kernel when possible
-        if QUANTUM_OK:
+        quantum_model = None
+        if QUANTUM_OK or QENGINE_OK:
             try:
-                # Build circuits from X_reduced (normalized & padded to fixed qubit count)
-                circuits = build_quantum_circuits_from_X(X_reduced, n_qubits=4)
-                quantum_kernel_matrix = quantum_kernel_state_fidelity(circuits)
+                if quantum_states is not None and QMODEL_OK:
+                    # Fitted model keeps the training bounds and statevectors to score unseen rows
+                    model_mode = kernel_method if kernel_method in ("linear", "nystrom") else "fidelity"
+                    if model_mode == "linear" and n_qubits > qkernels.MAX_DENSITY_QUBITS:
+                        print(f" Linear QSVM needs 4^n features; using the fidelity kernel for {n_qubits} qubits")
+                        model_mode = "fidelity"
+                    quantum_model = QuantumKernelSVM(n_qubits=n_qubits, reps=reps, n_workers=n_workers,
+                                                     n_jobs=kernel_threads, precision=precision, mode=model_mode,
+                                                     n_landmarks=n_landmarks, landmark_sampling=landmark_sampling,
+                                                     random_state=42)
+
+                    if model_mode != "fidelity":
+                        # Explicit vec(psi psi^H) or Nystrom features: linear-time training instead of
+                        # an n x n kernel
+                        quantum_model.fit(X_unique, y_unique, quantum_states=quantum_states, sample_weight=row_counts)
+                        y_pred_unique, y_proba_unique = quantum_model.predict_with_proba(
+                            quantum_states=quantum_states)
+                        y_pred_quantum, y_proba_quantum = y_pred_unique[inverse], y_proba_unique[inverse]
+
+                        if model_mode == "linear":
+                            agreement = qkernels.linear_qsvm_agreement(quantum_states.states, y_unique)
+                            print(f" Linear QSVM vs precomputed-kernel SVC on {agreement['n_samples']} samples: "
+                                  f"{agreement['prediction_agreement']:.1%} prediction agreement, "
+                                  f"kernel max error {agreement['kernel_max_error']:.2e}")
+                            print(" Linear QSVM training completed!")
+                        else:
+                            report = quantum_model.fit_report_
+                            print(f" Nyström QSVM: m={report['n_landmarks']} landmarks (rank {report['rank']}), "
+                                  f"kernel {report['kernel_time']:.3f}s, fit {report['fit_time']:.3f}s, "
+                                  f"train accuracy {np.mean(y_pred_quantum == y_array):.3f}, "
+                                  f"kernel max error {report['kernel_max_error']:.2e}")
+                            print(" Nyström QSVM training completed!")
+                    else:
+                        # Reuse the statevectors from Step 1 (normalized & padded to fixed qubit count)
+                        kernel_start = time.time()
+                        quantum_kernel_matrix = quantum_kernel_state_fidelity(
+                            quantum_states.states, method=kernel_method, use_cache=use_kernel_cache,
+                            n_jobs=kernel_threads,
+                            transaction_ids=None if kernel_ids is None else np.asarray(kernel_ids)[unique_rows])
+                        kernel_time = time.time() - kernel_start
+                        quantum_model.fit(X_unique, y_unique, quantum_states=quantum_states,
+                                          kernel=quantum_kernel_matrix, sample_weight=row_counts)
+                        quantum_model.fit_report_["kernel_time"] = kernel_time
+                        y_pred_quantum = quantum_model.clf_.predict(quantum_kernel_matrix)[inverse]
+                        y_proba_quantum = quantum_model.clf_.predict_proba(quantum_kernel_matrix)[inverse]
+
+                        print(f" Keeping {quantum_model.n_support_vectors_}/{len(y_unique)} support-vector "
+                              f"statevectors for scoring")
+                        print(" Quantum fidelity-kernel SVM training completed!")
+                else:
+                    # Per-circuit Qiskit simulation when the batched engine is unavailable
+                    circuits = build_quantum_circuits_from_X(X_reduced, n_qubits=n_qubits, reps=reps)
+                    quantum_kernel_matrix = quantum_kernel_state_fidelity(circuits, method=kernel_method,
+                                                                          use_cache=use_kernel_cache,
+                                                                          n_jobs=kernel_threads)
 
-                # Train SVM with precomputed quantum kernel
-                clf = SVC(kernel='precomputed', probability=True, class_weight="balanced", random_state=42)
-                clf.fit(quantum_kernel_matrix, y)
-                y_pred_quantum = clf.predict(quantum_kernel_matrix)
-                y_proba_quantum = clf.predict_proba(quantum_kernel_matrix)
+                    # Train SVM with precomputed quantum kernel
+                    clf = SVC(kernel='precomputed', probability=True, class_weight="balanced", random_state=42)
+                    clf.fit(quantum_kernel_matrix, y)
+                    y_pred_quantum = clf.predict(quantum_kernel_matrix)
+                    y_proba_quantum = clf.predict_proba(quantum_kernel_matrix)
 
-                print(" Quantum fidelity-kernel SVM training completed!")
+                    print(" Quantum fidelity-kernel SVM training completed!")
 
             except Exception as kernel_error:
                 print(f" Quantum kernel failed, falling back to expectation-features+RBF: {kernel_error}")
-                # Fallback: compute expectation-based features and use classical RBF SVM
-                quantum_features = encode_quantum_features(X_reduced)
+                # Fallback: expectation-based features from Step 1 with classical RBF SVM
+                quantum_model = None
                 clf = SVC(kernel="rbf", probability=True, class_weight="balanced", random_state=42)
                 clf.fit(quantum_features, y)
                 y_pred_quantum = clf.predict(quantum_features)
                 y_proba_quantum = clf.predict_proba(quantum_features)
         else:
-            # Fallback to classical SVM if quantum not available
-            quantum_features = encode_quantum_features(X_reduced)
+            # Fallback to classical SVM if quantum not available (quantum_features is X_reduced)
             clf = SVC(kernel="rbf", probability=True, class_weight="balanced", random_state=42)
             clf.fit(quantum_features, y)
             y_pred_quantum = clf.predict(quantum_features)
@@ -1554,14 +1906,14 @@ def build_quantum_svm_enhanced(X_reduced, y):
        # print(f" QUANTUM SVM COMPLETED IN {training_time:.3f} SECONDS")
         print("=" * 60)
 
-        return y_pred_quantum, y_proba_quantum, training_time
+        return y_pred_quantum, y_proba_quantum, training_time, quantum_model
 
     except Exception as e:
         st.error(f" Quantum SVM training error: {str(e)}")
         # Return dummy results to prevent crash
         dummy_pred = np.zeros(len(y))
         dummy_proba = np.column_stack([np.ones(len(y)) * 0.5, np.ones(len(y)) * 0.5])
-        return dummy_pred, dummy_proba, 0.001
+        return dummy_pred, dummy_proba, 0.001, None
 
 
 def animated_processing_steps(mode="single"):
@@ -1998,6 +2350,128 @@ if algorithm == "Quantum circuit":
         st.warning(f"Circuit image not found in {upload_dir}. Place a file named {img_basename}.jpg/.png or upload one to the gallery.")
     st.stop()
 
+# Quantum kernel settings (only relevant when the Quantum SVM runs)
+quantum_kernel_method = "gemm"
+nystrom_landmarks = 200
+nystrom_sampling = "uniform"
+quantum_n_qubits = DEFAULT_N_QUBITS
+feature_map_reps = DEFAULT_FEATURE_MAP_REPS
+simulation_workers = DEFAULT_SIMULATION_WORKERS
+kernel_threads = DEFAULT_KERNEL_THREADS
+quantum_precision = DEFAULT_PRECISION
+use_statevector_cache = True
+use_embedding_store = True
+use_kernel_cache = True
+incremental_kernel = False
+if algorithm in ("Quantum SVM (Experimental)", "Compare Both Algorithms"):
+    st.sidebar.markdown("###  Quantum Kernel")
+    quantum_kernel_label = st.sidebar.selectbox(
+        "Kernel Construction",
+        list(QUANTUM_KERNEL_METHODS.keys()),
+        help="Tiled GEMM computes |S.S^H|^2 with BLAS; pairwise loop is the original reference implementation; "
+             "out-of-core memmap spills tiles to disk for very large selections; "
+             "Linear QSVM trains a linear model on explicit density-matrix features in O(n)"
+    )
+    quantum_kernel_method = QUANTUM_KERNEL_METHODS[quantum_kernel_label]
+    quantum_n_qubits = st.sidebar.slider(
+        "Qubits", min_value=2, max_value=MAX_N_QUBITS, value=DEFAULT_N_QUBITS,
+        help="Register size; PCA keeps up to one component per qubit and extra qubits are padded. "
+             "Large registers switch to a memory-aware per-sample simulation path"
+    )
+    feature_map_reps = st.sidebar.slider(
+        "Feature Map Repetitions", min_value=1, max_value=6, value=DEFAULT_FEATURE_MAP_REPS,
+        help="Number of RY/CNOT blocks in the feature map"
+    )
+    quantum_precision = PRECISION_OPTIONS[st.sidebar.selectbox(
+        "Numerical Precision", list(PRECISION_OPTIONS.keys()),
+        help="Single precision halves statevector and kernel memory; the benchmark reports its deviation"
+    )]
+    if QENGINE_OK and quantum_n_qubits >= qengine.PARALLEL_MIN_QUBITS:
+        simulation_workers = st.sidebar.slider(
+            "Simulation Workers", min_value=1, max_value=max(1, os.cpu_count() or 1), value=DEFAULT_SIMULATION_WORKERS,
+            help="Processes that share wide-register simulation; results return through shared memory"
+        )
+    if quantum_kernel_method != "linear":
+        kernel_threads = st.sidebar.slider(
+            "Kernel Threads", min_value=1, max_value=max(1, os.cpu_count() or 1), value=DEFAULT_KERNEL_THREADS,
+            help="Threads computing kernel tiles concurrently (BLAS is pinned to one thread per tile)"
+        )
+    if quantum_kernel_method == "nystrom":
+        nystrom_landmarks = st.sidebar.slider(
+            "Nyström Rank (landmarks)", min_value=10, max_value=2000, value=200, step=10,
+            help="Kernel cost is O(n·m); larger m tracks the exact kernel more closely"
+        )
+        nystrom_sampling = LANDMARK_SAMPLING_OPTIONS[
+            st.sidebar.selectbox("Landmark Sampling", list(LANDMARK_SAMPLING_OPTIONS.keys()))]
+    if QENGINE_OK:
+        use_statevector_cache = st.sidebar.checkbox(
+            "Reuse Cached Statevectors", value=True,
+            help="Keeps simulated statevectors in memory so reruns over overlapping selections skip simulation"
+        )
+        if use_statevector_cache:
+            cache_tolerance = st.sidebar.select_slider(
+                "Cache Angle Tolerance (rad)", options=[1e-12, 1e-9, 1e-6, 1e-4], value=1e-9,
+                format_func=lambda v: f"{v:.0e}"
+            )
+            qengine.STATEVECTOR_CACHE.configure(tolerance=cache_tolerance)
+            cache_stats = qengine.STATEVECTOR_CACHE.stats()
+            st.sidebar.caption(f"Statevector cache: {cache_stats['hits']:,} hits / {cache_stats['misses']:,} misses, "
+                               f"{cache_stats['entries']:,} entries ({cache_stats['bytes'] / 1e6:.1f} MB)")
+    if QSTORE_OK:
+        use_embedding_store = st.sidebar.checkbox(
+            "Persist Embeddings by TransactionID", value=True,
+            help="Stores statevectors and Pauli-Z features on disk so re-uploaded transactions are not re-simulated"
+        )
+        if use_embedding_store:
+            embedding_store_mb = st.sidebar.slider(
+                "Embedding Store Cap (MB)", min_value=64, max_value=16384, value=1024, step=64,
+                help="Each new normalisation (e.g. after a filter change) stores a full copy of the embeddings; "
+                     "the oldest copies are dropped once the store exceeds this size"
+            )
+            try:
+                qstore.EMBEDDING_STORE.configure(max_bytes=embedding_store_mb * 1024 * 1024)
+                store_stats = qstore.EMBEDDING_STORE.stats()
+                st.sidebar.caption(f"Embedding store: {store_stats['transactions']:,} transactions in "
+                                   f"{store_stats['contexts']:,} contexts ({store_stats['bytes'] / 1e6:.1f} MB); "
+                                   f"{store_stats['pruned_contexts']:,} old contexts pruned "
+                                   f"({store_stats['pruned_bytes'] / 1e6:.1f} MB freed)")
+            except Exception as store_error:
+                st.sidebar.caption(f"Embedding store unavailable: {store_error}")
+    if QKERNELS_OK and quantum_kernel_method in ("gemm", "loop"):
+        use_kernel_cache = st.sidebar.checkbox(
+            "Cache Kernel Matrices on Disk", value=True,
+            help="Re-running on the same selection loads the fidelity kernel instead of rebuilding it"
+        )
+        if use_kernel_cache:
+            kernel_cache_mb = st.sidebar.slider("Kernel Cache Cap (MB)", min_value=64, max_value=8192, value=512,
+                                                step=64)
+            try:
+                qkernels.KERNEL_CACHE.configure(max_bytes=kernel_cache_mb * 1024 * 1024)
+                kernel_cache_stats = qkernels.KERNEL_CACHE.stats()
+                tile_cache_stats = qkernels.KERNEL_TILE_CACHE.stats()
+                st.sidebar.caption(f"Kernel cache: {kernel_cache_stats['entries']:,} matrices "
+                                   f"({kernel_cache_stats['bytes'] / 1e6:.1f} MB), {tile_cache_stats['entries']:,} "
+                                   f"tiles ({tile_cache_stats['bytes'] / 1e6:.1f} of "
+                                   f"{qkernels.KERNEL_TILE_CACHE.max_bytes / 1e6:.0f} MB)")
+            except Exception as cache_error:
+                st.sidebar.caption(f"Kernel cache unavailable: {cache_error}")
+    if QKERNELS_OK and quantum_kernel_method == "memmap":
+        try:
+            memmap_stats = qkernels.memmap_kernel_stats()
+            st.sidebar.caption(f"Out-of-core kernels on disk: {memmap_stats['files']} "
+                               f"({memmap_stats['bytes'] / 1e9:.2f} GB; the {qkernels.MEMMAP_KERNELS_KEEP} "
+                               f"most recent are kept)")
+            if memmap_stats["files"] and st.sidebar.button("Delete Out-of-Core Kernels", key="clear_memmap_kernels"):
+                qkernels.clear_memmap_kernels()
+        except Exception as memmap_error:
+            st.sidebar.caption(f"Out-of-core kernel files unavailable: {memmap_error}")
+    if QKERNELS_OK and quantum_kernel_method == "gemm":
+        incremental_kernel = st.sidebar.checkbox(
+            "Incremental Kernel on Filter Changes", value=False,
+            help="Fits PCA and the angle scaling once on the full dataset so transactions kept across filter "
+                 "changes keep their kernel rows; only newly selected transactions are computed"
+        )
+
 st.sidebar.markdown("###  Display Options")
 show_detailed_metrics = st.sidebar.checkbox("Show Detailed Metrics", value=True)
 show_feature_analysis = st.sidebar.checkbox("Show Feature Analysis", value=False)
@@ -2015,6 +2489,18 @@ with st.sidebar.expander("Benchmarking & Provenance"):
             with st.spinner("Running benchmark suite..."):
                 runs = benchmark_mod.run_benchmark_suite(suite_name="demo")
                 st.sidebar.success(f"Saved {len(runs)} benchmark runs.")
+        if st.button("Cross-check Statevector Engines", key="cross_check_engines",
+                     help="Compare the NumPy statevector engine with Qiskit on random feature-map angles"):
+            with st.spinner("Simulating with both engines..."):
+                check = benchmark_mod.benchmark_engine_agreement()
+            if "error" in check:
+                st.sidebar.warning(f"Cross-check unavailable: {check['error']}")
+            elif check["within_tolerance"]:
+                st.sidebar.success(f"NumPy engine matches Qiskit: max deviation {check['max_deviation']:.1e} "
+                                   f"(tolerance {check['atol']:.0e})")
+            else:
+                st.sidebar.error(f"NumPy engine deviates from Qiskit by up to {check['max_deviation']:.1e} "
+                                 f"(tolerance {check['atol']:.0e})")
         if PROV_OK and st.button("Show Saved Runs", key="show_runs"):
             runs = provenance_mod.load_runs()
             st.sidebar.write(f"Saved runs: {len(runs)}")
@@ -2023,6 +2509,30 @@ with st.sidebar.expander("Benchmarking & Provenance"):
     else:
         st.sidebar.write("Benchmarking not available (optional dependency missing).")
 
+use_loaded_model = False
+if MART_OK:
+    with st.sidebar.expander("Saved Models"):
+        saved_models = martifacts.list_pipelines()
+        if saved_models:
+            chosen_model = st.selectbox("Model artifact", [name for name, _ in saved_models], key="saved_model")
+            if st.button("Load Model", key="load_model"):
+                try:
+                    load_start = time.time()
+                    loaded = martifacts.load_pipeline(os.path.join(martifacts.MODEL_DIR, chosen_model))
+                    st.session_state["loaded_pipeline"] = st.session_state["fitted_pipeline"] = loaded
+                    st.success(f"Loaded {chosen_model} ({', '.join(loaded.models)}) in "
+                               f"{(time.time() - load_start) * 1000:.1f} ms")
+                except Exception as e:
+                    st.error(f" Could not load model: {str(e)}")
+        else:
+            st.caption("No saved models yet; fit one and save it under Score New Transactions.")
+        if "loaded_pipeline" in st.session_state:
+            use_loaded_model = st.checkbox(
+                "Use loaded model instead of retraining", value=True, key="use_loaded_model",
+                help="Fraud detection scores the uploaded transactions with the loaded model; "
+                     "algorithms missing from it are still trained"
+            )
+
 
 
 if uploaded_file is not None:
@@ -2074,6 +2584,11 @@ if uploaded_file is not None:
 
         # AUTO-UPDATE WHEN FILTERS CHANGE
         auto_update = st.sidebar.checkbox(" Auto-update on filter change", value=False)
+        fit_once = st.sidebar.checkbox(
+            " Fit once per dataset", value=False,
+            help="Fits the preprocessing and both SVMs on all uploaded transactions once; filter changes then "
+                 "only select rows from the stored predictions instead of retraining"
+        )
 
         # ENHANCED FILTER APPLICATION WITH ROBUST ERROR HANDLING
         try:
@@ -2126,7 +2641,7 @@ if uploaded_file is not None:
 
         # ENHANCED DATA PREPROCESSING
         try:
-            X = filtered_df[["Amount", "CountryRisk", "TimeOfDay", "SenderBlacklisted", "SenderAgeDays"]]
+            X = filtered_df[FEATURE_COLUMNS]
             y = filtered_df["Label"]
 
             # More robust data validation
@@ -2140,7 +2655,40 @@ if uploaded_file is not None:
                 st.error(" No valid labels found in data.")
                 st.stop()
 
-            scaler, pca, X_reduced = build_preprocessor(X)
+            quantum_bounds = None
+            if incremental_kernel or fit_once:
+                # Preprocess every uploaded transaction the same way regardless of the filters, so rows kept
+                # across filter changes keep their statevectors, kernel rows and scores
+                data_fingerprint = dataset_fingerprint(df)
+                scaler, pca, X_all_reduced = full_dataset_fit(
+                    "preprocessor", (data_fingerprint, quantum_n_qubits),
+                    lambda: build_preprocessor(df[X.columns], n_components=quantum_n_qubits))
+                X_all_reduced = np.asarray(X_all_reduced)
+                filtered_rows = df.index.get_indexer(filtered_df.index)
+                X_reduced = X_all_reduced[filtered_rows]
+                if QENGINE_OK:
+                    quantum_bounds = qengine.normalize_features(X_all_reduced)[1]
+                if fit_once:
+                    st.caption(f"Models are fitted once on all {len(df):,} uploaded transactions; "
+                               f"filter changes only select their scores.")
+                    # Settings that change the fitted quantum model; workers, threads and caches do not
+                    quantum_fit_settings = (quantum_n_qubits, feature_map_reps, quantum_precision,
+                                            quantum_kernel_method, nystrom_landmarks, nystrom_sampling)
+
+                    def fit_quantum_svm_on_dataset(X_all_reduced):
+                        return build_quantum_svm_enhanced(
+                            X_all_reduced, df["Label"], kernel_method=quantum_kernel_method,
+                            n_landmarks=nystrom_landmarks, landmark_sampling=nystrom_sampling,
+                            use_cache=use_statevector_cache,
+                            transaction_ids=df["TransactionID"].values if use_embedding_store else None,
+                            use_kernel_cache=use_kernel_cache,
+                            n_qubits=quantum_n_qubits, reps=feature_map_reps,
+                            n_workers=simulation_workers, kernel_threads=kernel_threads,
+                            precision=quantum_precision, bounds=quantum_bounds)
+            else:
+                scaler, pca, X_reduced = build_preprocessor(X, n_components=quantum_n_qubits)
+
+            loaded_pipeline = st.session_state.get("loaded_pipeline") if use_loaded_model else None
 
             if X_reduced is None:
                 st.error(" Data preprocessing failed.")
@@ -2174,8 +2722,20 @@ if uploaded_file is not None:
                     try:
                         status_text.markdown('<div style="color: #8B5A3C; font-size: 14px; font-weight: 600;"> Running Classical SVM Analysis...</div>', unsafe_allow_html=True)
                         progress_bar.progress(25)
-                        clf_classical, training_time_classical, y_pred_classical, y_proba_classical = build_classical_svm(
-                            X_reduced, y)
+                        if loaded_pipeline is not None and loaded_pipeline.classical is not None:
+                            clf_classical, training_time_classical = loaded_pipeline.classical, 0.0
+                            y_pred_classical, y_proba_classical = loaded_pipeline.score(X, model="classical")
+                        elif fit_once:
+                            clf_classical, training_time_classical, y_pred_classical, y_proba_classical = \
+                                full_dataset_fit("classical", (data_fingerprint, quantum_n_qubits),
+                                                 lambda: build_classical_svm(X_all_reduced, df["Label"]))
+                            y_pred_classical = np.asarray(y_pred_classical)[filtered_rows]
+                            y_proba_classical = np.asarray(y_proba_classical)[filtered_rows]
+                        else:
+                            clf_classical, training_time_classical, y_pred_classical, y_proba_classical = \
+                                build_classical_svm(X_reduced, y)
+                        if loaded_pipeline is None:
+                            update_fitted_pipeline(scaler, pca, classical=clf_classical)
                         classical_metrics = calculate_all_metrics(y, y_pred_classical, y_proba_classical)
                         classical_success = True
                     except Exception as e:
@@ -2186,8 +2746,33 @@ if uploaded_file is not None:
                     try:
                         status_text.markdown('<div style="color: #8B5A3C; font-size: 14px; font-weight: 600;">⚛️ Running Quantum SVM Analysis...</div>', unsafe_allow_html=True)
                         progress_bar.progress(75)
-                        y_pred_quantum, y_proba_quantum, training_time_quantum = build_quantum_svm_enhanced(X_reduced,
-                                                                                                            y)
+                        if loaded_pipeline is not None and loaded_pipeline.quantum is not None:
+                            quantum_model, training_time_quantum = loaded_pipeline.quantum, 0.0
+                            y_pred_quantum, y_proba_quantum = loaded_pipeline.score(X, model="quantum")
+                        elif fit_once:
+                            y_pred_quantum, y_proba_quantum, training_time_quantum, quantum_model = \
+                                full_dataset_fit("quantum", (data_fingerprint,) + quantum_fit_settings,
+                                                 lambda: fit_quantum_svm_on_dataset(X_all_reduced))
+                            y_pred_quantum = np.asarray(y_pred_quantum)[filtered_rows]
+                            y_proba_quantum = np.asarray(y_proba_quantum)[filtered_rows]
+                        else:
+                            y_pred_quantum, y_proba_quantum, training_time_quantum, quantum_model = \
+                                build_quantum_svm_enhanced(X_reduced, y, kernel_method=quantum_kernel_method,
+                                                           n_landmarks=nystrom_landmarks,
+                                                           landmark_sampling=nystrom_sampling,
+                                                           use_cache=use_statevector_cache,
+                                                           transaction_ids=filtered_df["TransactionID"].values
+                                                           if use_embedding_store else None,
+                                                           use_kernel_cache=use_kernel_cache,
+                                                           n_qubits=quantum_n_qubits, reps=feature_map_reps,
+                                                           n_workers=simulation_workers,
+                                                           kernel_threads=kernel_threads,
+                                                           precision=quantum_precision,
+                                                           kernel_ids=filtered_df["TransactionID"].values
+                                                           if incremental_kernel else None,
+                                                           bounds=quantum_bounds)
+                        if loaded_pipeline is None:
+                            update_fitted_pipeline(scaler, pca, quantum=quantum_model)
                         quantum_metrics = calculate_all_metrics(y, y_pred_quantum, y_proba_quantum)
                         quantum_success = True
                     except Exception as e:
@@ -2255,6 +2840,9 @@ if uploaded_file is not None:
                                     f'<div class="metric-container"><h4>{training_time_quantum:.3f}s</h4><p>Training Time</p></div>',
                                     unsafe_allow_html=True)
 
+                            quantum_fit_summary = describe_quantum_fit(quantum_model)
+                            if quantum_fit_summary:
+                                st.caption(quantum_fit_summary)
                             st.markdown('</div>', unsafe_allow_html=True)
 
                         # Comparative visualizations
@@ -2347,11 +2935,44 @@ if uploaded_file is not None:
                         if algorithm == "Quantum SVM (Experimental)":
                             status_text.markdown('<div style="color: #8B5A3C; font-size: 14px; font-weight: 600;"> Running Quantum Circuits & Kernel Calculations...</div>', unsafe_allow_html=True)
                             progress_bar.progress(60)
-                            y_pred, y_proba, training_time = build_quantum_svm_enhanced(X_reduced, y)
+                            if loaded_pipeline is not None and loaded_pipeline.quantum is not None:
+                                quantum_model, training_time = loaded_pipeline.quantum, 0.0
+                                y_pred, y_proba = loaded_pipeline.score(X, model="quantum")
+                            elif fit_once:
+                                y_pred, y_proba, training_time, quantum_model = full_dataset_fit(
+                                    "quantum", (data_fingerprint,) + quantum_fit_settings,
+                                    lambda: fit_quantum_svm_on_dataset(X_all_reduced))
+                                y_pred, y_proba = np.asarray(y_pred)[filtered_rows], np.asarray(y_proba)[filtered_rows]
+                            else:
+                                y_pred, y_proba, training_time, quantum_model = build_quantum_svm_enhanced(
+                                    X_reduced, y, kernel_method=quantum_kernel_method,
+                                    n_landmarks=nystrom_landmarks, landmark_sampling=nystrom_sampling,
+                                    use_cache=use_statevector_cache,
+                                    transaction_ids=filtered_df["TransactionID"].values
+                                    if use_embedding_store else None,
+                                    use_kernel_cache=use_kernel_cache,
+                                    n_qubits=quantum_n_qubits, reps=feature_map_reps,
+                                    n_workers=simulation_workers, kernel_threads=kernel_threads,
+                                    precision=quantum_precision,
+                                    kernel_ids=filtered_df["TransactionID"].values if incremental_kernel else None,
+                                    bounds=quantum_bounds)
+                            if loaded_pipeline is None:
+                                update_fitted_pipeline(scaler, pca, quantum=quantum_model)
                         else:
                             status_text.markdown('<div style="color: #8B5A3C; font-size: 14px; font-weight: 600;"> Training Classical SVM Model...</div>', unsafe_allow_html=True)
                             progress_bar.progress(60)
-                            clf, training_time, y_pred, y_proba = build_classical_svm(X_reduced, y)
+                            if loaded_pipeline is not None and loaded_pipeline.classical is not None:
+                                clf, training_time = loaded_pipeline.classical, 0.0
+                                y_pred, y_proba = loaded_pipeline.score(X, model="classical")
+                            elif fit_once:
+                                clf, training_time, y_pred, y_proba = full_dataset_fit(
+                                    "classical", (data_fingerprint, quantum_n_qubits),
+                                    lambda: build_classical_svm(X_all_reduced, df["Label"]))
+                                y_pred, y_proba = np.asarray(y_pred)[filtered_rows], np.asarray(y_proba)[filtered_rows]
+                            else:
+                                clf, training_time, y_pred, y_proba = build_classical_svm(X_reduced, y)
+                            if loaded_pipeline is None:
+                                update_fitted_pipeline(scaler, pca, classical=clf)
 
                         status_text.markdown('<div style="color: #8B5A3C; font-size: 14px; font-weight: 600;"> Analysis Complete - Generating Results...</div>', unsafe_allow_html=True)
                         progress_bar.progress(100)
@@ -2375,6 +2996,10 @@ if uploaded_file is not None:
                         c4.markdown(
                             f'<div class="metric-container"><h3>{accuracy:.1f}%</h3><p>Model Accuracy</p></div>',
                             unsafe_allow_html=True)
+                        if algorithm == "Quantum SVM (Experimental)":
+                            quantum_fit_summary = describe_quantum_fit(quantum_model)
+                            if quantum_fit_summary:
+                                st.caption(quantum_fit_summary)
 
                         # Dashboard charts
                         
@@ -2554,6 +3179,38 @@ else:
     -  Compare Both: Comprehensive side-by-side comparison
     """)
 
+# SCORE NEW TRANSACTIONS WITH THE FITTED OR LOADED MODEL (no retraining)
+if MART_OK and "fitted_pipeline" in st.session_state:
+    fitted_pipeline = st.session_state["fitted_pipeline"]
+    with st.expander(" Score New Transactions (fitted or loaded model)", expanded=False):
+        scoring_model = st.radio("Model", fitted_pipeline.models, horizontal=True, key="scoring_model",
+                                 format_func=lambda name: "Quantum SVM" if name == "quantum" else "Classical SVM")
+        score_file = st.file_uploader("Upload transactions to score", type=["csv"], key="score_file",
+                                      help="Same columns as the training CSV; Label is optional")
+        if score_file is not None:
+            try:
+                score_df = load_dataset(score_file, require_label=False)
+                score_start = time.time()
+                new_pred, new_proba = fitted_pipeline.score(score_df[FEATURE_COLUMNS], model=scoring_model)
+                st.caption(f"Scored {len(score_df):,} transactions in {time.time() - score_start:.3f}s")
+                score_df["Predicted_Label"] = new_pred
+                score_df["Fraud_Probability"] = new_proba[:, 1]
+                st.dataframe(score_df, use_container_width=True)
+            except Exception as e:
+                st.error(f" Scoring error: {str(e)}")
+
+        model_name = st.text_input("Model name", value="fraud-pipeline", key="model_name",
+                                   help=f"Saved as a versioned artifact under {martifacts.MODEL_DIR}")
+        if st.button("Save Model", key="save_model"):
+            try:
+                model_name = "".join(c for c in model_name if c.isalnum() or c in "-_.").strip(".") or "fraud-pipeline"
+                fitted_pipeline.metadata.update({"name": model_name, "feature_columns": FEATURE_COLUMNS,
+                                                 "models": fitted_pipeline.models})
+                saved_path = fitted_pipeline.save(os.path.join(martifacts.MODEL_DIR, model_name))
+                st.success(f"Saved {', '.join(fitted_pipeline.models)} model to {saved_path}")
+            except Exception as e:
+                st.error(f" Could not save model: {str(e)}")
+
    
 
 
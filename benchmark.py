@@ -45,22 +45,56 @@ def sample_ghz(n=3):
         return {"type": "ghz", "n": n}
 
 
-def run_circuit_sim(circuit, shots=1024):
+def sample_feature_map(n=4, seed=0):
+    """Parameterised RY/CNOT feature-map template (with measurements) and one random angle row.
+
+    Returns (circuit, parameter_values); run_circuit_sim binds the values.
+    The template is quantum_sampling.measured_template, already transpiled
+    once for the shared simulator, so pass transpiled=True to run_circuit_sim.
+    """
+    _ensure_qiskit()
+    if QISKIT_OK:
+        try:
+            import numpy as np
+            import quantum_sampling
+            qc = quantum_sampling.measured_template(n)
+            values = np.random.RandomState(seed).uniform(0, np.pi, n).tolist()
+            return qc, values
+        except Exception:
+            pass
+    return {"type": "feature_map", "n": n}, None
+
+
+def run_circuit_sim(circuit, shots=1024, parameter_values=None, transpiled=False):
     """Run circuit on AerSimulator if available; otherwise return a stub result.
 
     This function returns a JSON-serializable dict with integer `counts` keyed by
-    bitstrings (summing to `shots`) and a `runtime` float.
+    bitstrings (summing to `shots`) and a `runtime` float. For a parameterised
+    template, `parameter_values` are bound first and the binding time is
+    reported separately as `construction_time`. transpiled=True skips
+    transpilation for circuits already transpiled for the shared simulator
+    (e.g. quantum_sampling.measured_template).
     """
     start = time.time()
     _ensure_qiskit()
+    construction_time = None
+    if QISKIT_OK and parameter_values is not None:
+        try:
+            circuit = circuit.assign_parameters(parameter_values)
+            construction_time = time.time() - start
+        except Exception as e:
+            return {"error": str(e)}
     if QISKIT_OK:
         try:
             # import AerSimulator lazily (may not be installed in some envs)
             from qiskit import transpile
             try:
-                from qiskit.providers.aer import AerSimulator  # type: ignore
-                sim = AerSimulator()
-                t_qc = transpile(circuit, sim)
+                import quantum_sampling
+                # One simulator instance is reused across calls
+                sim = quantum_sampling.get_simulator()
+                if sim is None:
+                    raise ImportError("qiskit-aer is not installed")
+                t_qc = circuit if transpiled else transpile(circuit, sim)
                 job = sim.run(t_qc, shots=shots)
                 result = job.result()
                 raw_counts = result.get_counts()
@@ -68,6 +102,8 @@ def run_circuit_sim(circuit, shots=1024):
                 counts = {str(k): int(v) for k, v in raw_counts.items()}
                 rtime = time.time() - start
                 metrics = {"counts": counts, "runtime": rtime}
+                if construction_time is not None:
+                    metrics["construction_time"] = construction_time
                 return metrics
             except Exception:
                 # As fallback, try to simulate via Statevector if available
@@ -90,7 +126,10 @@ def run_circuit_sim(circuit, shots=1024):
                         key_max = max(counts, key=counts.get)
                         counts[key_max] += shots - total
                     rtime = time.time() - start
-                    return {"counts": counts, "runtime": rtime}
+                    metrics = {"counts": counts, "runtime": rtime}
+                    if construction_time is not None:
+                        metrics["construction_time"] = construction_time
+                    return metrics
                 except Exception as e:
                     return {"error": str(e)}
         except Exception as e:
@@ -113,16 +152,224 @@ def run_circuit_sim(circuit, shots=1024):
         return {"counts": counts, "runtime": rtime}
 
 
+def benchmark_feature_map(n_samples=1000, n_qubits=4, seed=0):
+    """Time feature-map circuit construction separately from simulation.
+
+    Compares building each circuit gate by gate with binding the precompiled
+    ParameterVector template, then times Qiskit statevector simulation of the
+    bound circuits and the batched NumPy engine on the same angles.
+    """
+    try:
+        import numpy as np
+        import quantum_engine as qengine
+    except Exception as e:
+        return {"error": str(e)}
+
+    angles = np.random.RandomState(seed).uniform(0, np.pi, (n_samples, n_qubits))
+    result = {"n_samples": n_samples, "n_qubits": n_qubits}
+    _ensure_qiskit()
+    if QISKIT_OK:
+        try:
+            from qiskit.quantum_info import Statevector
+
+            start = time.time()
+            for row in angles:
+                qengine.circuit_from_ops(row)
+            result["construction_gate_by_gate"] = time.time() - start
+
+            qengine.feature_map_template(n_qubits)
+            start = time.time()
+            circuits = qengine.feature_map_circuits(angles)
+            result["construction_template_bind"] = time.time() - start
+
+            start = time.time()
+            for qc in circuits:
+                Statevector.from_instruction(qc)
+            result["simulation_qiskit"] = time.time() - start
+        except Exception as e:
+            result["error"] = str(e)
+
+    start = time.time()
+    qengine.simulate_statevectors(angles, engine="numpy")
+    result["simulation_numpy"] = time.time() - start
+    return result
+
+
+def benchmark_engine_agreement(n_samples=50, qubit_counts=(1, 2, 3, 4, 5), reps_list=(1, 2), atol=1e-10, seed=0):
+    """Check the NumPy statevector engine against Qiskit (quantum_engine.cross_check_engines).
+
+    Reports the max absolute amplitude deviation per (n_qubits, reps) and
+    whether every case is within atol.
+    """
+    try:
+        import numpy as np
+        import quantum_engine as qengine
+    except Exception as e:
+        return {"error": str(e)}
+
+    _ensure_qiskit()
+    if not QISKIT_OK:
+        return {"error": "qiskit not available"}
+    rng = np.random.RandomState(seed)
+    result = {"n_samples": n_samples, "atol": atol, "cases": []}
+    for n_qubits in qubit_counts:
+        angles = rng.uniform(0, np.pi, (n_samples, n_qubits))
+        for reps in reps_list:
+            try:
+                deviation, ok = qengine.cross_check_engines(angles, atol=atol, reps=reps)
+                result["cases"].append({"n_qubits": n_qubits, "reps": reps, "max_deviation": deviation,
+                                        "within_tolerance": ok})
+            except Exception as e:
+                result["cases"].append({"n_qubits": n_qubits, "reps": reps, "error": str(e)})
+    checked = [c for c in result["cases"] if "error" not in c]
+    result["max_deviation"] = max((c["max_deviation"] for c in checked), default=None)
+    # A case that failed to simulate counts as a failed check
+    result["within_tolerance"] = len(checked) == len(result["cases"]) and all(c["within_tolerance"] for c in checked)
+    return result
+
+
+def benchmark_parallel_simulation(n_samples=400, n_qubits=12, worker_counts=(1, 2, 4), reps=1, seed=0):
+    """Throughput of process-pool feature-map simulation for several worker counts.
+
+    Each entry reports wall time, samples per second and samples per second
+    per worker (core), next to the in-process single-core baseline.
+    """
+    try:
+        import os
+        import numpy as np
+        import quantum_engine as qengine
+    except Exception as e:
+        return {"error": str(e)}
+
+    angles = np.random.RandomState(seed).uniform(0, np.pi, (n_samples, n_qubits))
+    result = {"n_samples": n_samples, "n_qubits": n_qubits, "reps": reps, "cpu_count": os.cpu_count(), "runs": []}
+    start = time.time()
+    qengine.simulate_statevectors(angles, reps=reps)
+    baseline = time.time() - start
+    result["runs"].append({"workers": 0, "mode": "in-process", "runtime": baseline,
+                           "samples_per_s": n_samples / max(baseline, 1e-12),
+                           "samples_per_s_per_core": n_samples / max(baseline, 1e-12)})
+    for workers in worker_counts:
+        try:
+            start = time.time()
+            qengine.simulate_parallel(angles, n_workers=workers, reps=reps)
+            elapsed = time.time() - start
+            rate = n_samples / max(elapsed, 1e-12)
+            result["runs"].append({"workers": workers, "mode": "process-pool", "runtime": elapsed,
+                                   "samples_per_s": rate, "samples_per_s_per_core": rate / workers})
+        except Exception as e:
+            result["runs"].append({"workers": workers, "mode": "process-pool", "error": str(e)})
+    return result
+
+
+def benchmark_precision(n_samples=1500, n_test=500, n_qubits=4, seed=0):
+    """Single (complex64/float32) vs double precision for the quantum kernel path.
+
+    Reports simulation and kernel times and memory per precision, plus the
+    maximum kernel-entry deviation, the maximum fraud-probability deviation and
+    the fraction of differing predictions of the single-precision model
+    against double precision.
+    """
+    try:
+        import numpy as np
+        import quantum_engine as qengine
+        import quantum_kernels as qkernels
+        from quantum_model import QuantumKernelSVM
+    except Exception as e:
+        return {"error": str(e)}
+
+    rng = np.random.RandomState(seed)
+    X = rng.uniform(0, 1, (n_samples + n_test, 5))
+    y = ((X[:, 0] + 0.5 * X[:, 1] - 0.4 * X[:, 3] + 0.1 * rng.randn(len(X))) > 0.6).astype(int)
+    X_train, y_train, X_test = X[:n_samples], y[:n_samples], X[n_samples:]
+
+    result = {"n_samples": n_samples, "n_test": n_test, "n_qubits": n_qubits}
+    outputs = {}
+    for precision in ("double", "single"):
+        try:
+            start = time.time()
+            states = qengine.prepare_quantum_states(X_train, n_qubits=n_qubits, precision=precision)
+            simulate_time = time.time() - start
+            start = time.time()
+            K = qkernels.fidelity_kernel(states.states)
+            kernel_time = time.time() - start
+            model = QuantumKernelSVM(n_qubits=n_qubits, precision=precision, random_state=seed)
+            model.fit(X_train, y_train, quantum_states=states, kernel=K)
+            pred, proba = model.predict_with_proba(X_test)
+            outputs[precision] = (K, pred, proba)
+            result[precision] = {"simulate_time": simulate_time, "kernel_time": kernel_time,
+                                 "state_bytes": int(states.states.nbytes), "kernel_bytes": int(K.nbytes)}
+        except Exception as e:
+            result[precision] = {"error": str(e)}
+
+    if len(outputs) == 2:
+        (K64, pred64, proba64), (K32, pred32, proba32) = outputs["double"], outputs["single"]
+        result["max_kernel_deviation"] = float(np.max(np.abs(K64 - K32.astype(np.float64))))
+        result["max_probability_deviation"] = float(np.max(np.abs(proba64 - proba32)))
+        result["prediction_mismatch_rate"] = float(np.mean(pred64 != pred32))
+    return result
+
+
+def benchmark_shot_estimation(n_samples=40, n_qubits=4, shots_list=(128, 1024, 8192), reps=1, seed=0):
+    """Throughput and accuracy cost of finite-shot estimation against exact statevectors.
+
+    For each shot count, the Pauli-Z expectations (n_samples circuits) and
+    the fidelity kernel (n_samples * (n_samples - 1) / 2 circuits) are
+    estimated in batched jobs on the shared simulator. Reports circuits per
+    second and the max / mean absolute error against the exact values.
+    """
+    try:
+        import numpy as np
+        import quantum_engine as qengine
+        import quantum_kernels as qkernels
+        import quantum_sampling
+    except Exception as e:
+        return {"error": str(e)}
+
+    X = np.random.RandomState(seed).uniform(0, 1, (n_samples, n_qubits))
+    states = qengine.prepare_quantum_states(X, n_qubits=n_qubits, reps=reps)
+    exact_expectations = states.expectations()
+    exact_kernel = qkernels.fidelity_kernel(states.states)
+    n_pairs = n_samples * (n_samples - 1) // 2
+
+    result = {"n_samples": n_samples, "n_qubits": n_qubits, "reps": reps,
+              "backend": quantum_sampling.backend_name(), "runs": []}
+    for shots in shots_list:
+        try:
+            start = time.time()
+            expectations = quantum_sampling.estimate_expectations(states.angles, shots=shots, reps=reps, seed=seed)
+            expectation_time = time.time() - start
+            start = time.time()
+            kernel = quantum_sampling.estimate_fidelity_kernel(states.angles, shots=shots, reps=reps, seed=seed)
+            kernel_time = time.time() - start
+            expectation_error = np.abs(expectations - exact_expectations)
+            kernel_error = np.abs(kernel - exact_kernel)
+            result["runs"].append({
+                "shots": shots,
+                "expectation_time": expectation_time,
+                "expectation_circuits_per_s": n_samples / expectation_time if expectation_time > 0 else None,
+                "expectation_max_error": float(expectation_error.max()),
+                "expectation_mean_error": float(expectation_error.mean()),
+                "kernel_time": kernel_time,
+                "kernel_circuits_per_s": n_pairs / kernel_time if kernel_time > 0 else None,
+                "kernel_max_error": float(kernel_error.max()),
+                "kernel_mean_error": float(kernel_error.mean()),
+            })
+        except Exception as e:
+            result["runs"].append({"shots": shots, "error": str(e)})
+    return result
+
+
 def run_benchmark_suite(suite_name="default", backends=None, shots=1024):
     """Run a small suite of example circuits and save metadata using provenance.save_run
 
     Returns a list of per-run metadata dicts.
     """
     runs = []
-    circuits = {"ghz3": sample_ghz(3)}
-    for name, circ in circuits.items():
+    circuits = {"ghz3": (sample_ghz(3), None, False), "feature_map4": sample_feature_map(4) + (True,)}
+    for name, (circ, values, transpiled) in circuits.items():
         for backend in (backends or ["simulator"]):
-            res = run_circuit_sim(circ, shots=shots)
+            res = run_circuit_sim(circ, shots=shots, parameter_values=values, transpiled=transpiled)
             meta = {
                 "suite": suite_name,
                 "circuit": name,
@@ -132,4 +379,42 @@ def run_benchmark_suite(suite_name="default", backends=None, shots=1024):
             }
             saved = save_run(meta)
             runs.append(saved)
+    saved = save_run({
+        "suite": suite_name,
+        "circuit": "feature_map_construction",
+        "backend": "statevector",
+        "result": benchmark_feature_map(),
+    })
+    runs.append(saved)
+    saved = save_run({
+        "suite": suite_name,
+        "circuit": "feature_map_engine_agreement",
+        "backend": "statevector",
+        "result": benchmark_engine_agreement(),
+    })
+    runs.append(saved)
+    saved = save_run({
+        "suite": suite_name,
+        "circuit": "feature_map_parallel_simulation",
+        "backend": "statevector",
+        "result": benchmark_parallel_simulation(),
+    })
+    runs.append(saved)
+    saved = save_run({
+        "suite": suite_name,
+        "circuit": "quantum_kernel_precision",
+        "backend": "statevector",
+        "result": benchmark_precision(),
+    })
+    runs.append(saved)
+    shot_result = benchmark_shot_estimation()
+    # Without qiskit-aer the estimators sample from exact statevectors instead
+    shot_backend = shot_result.get("backend", "unavailable")
+    saved = save_run({
+        "suite": suite_name,
+        "circuit": "feature_map_shot_estimation",
+        "backend": shot_backend,
+        "result": shot_result,
+    })
+    runs.append(saved)
     return runs
@@ -0,0 +1,179 @@
+"""model_artifacts.py
+
+Versioned on-disk format for a fitted fraud-detection pipeline: the
+StandardScaler and PCA from build_preprocessor, the classical SVC and the
+QuantumKernelSVM (normalisation bounds, support-vector statevectors and SVC).
+An artifact is a directory holding a JSON manifest, one .npy section per
+large array and a small pickle with the rest of the estimator state. The
+array sections are opened as read-only memory maps, so loading takes
+milliseconds however many statevectors the model keeps.
+"""
+import os
+import copy
+import json
+import time
+import pickle
+import shutil
+
+import numpy as np
+
+FORMAT_NAME = "cross-border-fraud-pipeline"
+FORMAT_VERSION = 1
+
+MODEL_DIR = os.path.join(os.path.dirname(__file__), "static", "uploads", "models")
+
+MANIFEST_FILE = "manifest.json"
+ESTIMATORS_FILE = "estimators.pkl"
+
+# Array attributes at least this large are written as separate memory-mappable sections
+ARRAY_SECTION_MIN_BYTES = 64 * 1024
+
+
+def _split_arrays(component, name, min_bytes=ARRAY_SECTION_MIN_BYTES):
+    """(shallow copy of component without its large ndarray attributes, {section: array}).
+
+    Complex sections with no imaginary part (statevectors of the RY/CNOT
+    feature map) are stored as real arrays: half the size, and scoring can
+    use real GEMM directly on the memory map.
+    """
+    stripped = copy.copy(component)
+    sections = {}
+    for attr, value in vars(component).items():
+        if isinstance(value, np.ndarray) and value.dtype != object and value.nbytes >= min_bytes:
+            if np.iscomplexobj(value) and not np.any(value.imag):
+                value = value.real
+            sections[f"{name}.{attr}"] = value
+            setattr(stripped, attr, None)
+    return stripped, sections
+
+
+def _library_versions():
+    versions = {"numpy": np.__version__}
+    try:
+        import sklearn
+        versions["sklearn"] = sklearn.__version__
+    except Exception:
+        pass
+    return versions
+
+
+def save_pipeline(path, scaler=None, pca=None, classical=None, quantum=None, metadata=None):
+    """Write the given fitted components to the artifact directory `path` (replacing it).
+
+    The files are written to a temporary directory first and moved into place
+    once the manifest is complete, so a reader never sees half an artifact.
+    """
+    components = {"scaler": scaler, "pca": pca, "classical": classical, "quantum": quantum}
+    stripped, arrays = {}, {}
+    for name, component in components.items():
+        if component is not None:
+            stripped[name], sections = _split_arrays(component, name)
+            arrays.update(sections)
+
+    tmp_path = f"{path.rstrip(os.sep)}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for key, array in arrays.items():
+        np.save(os.path.join(tmp_path, f"{key}.npy"), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, ESTIMATORS_FILE), "wb") as f:
+        pickle.dump(stripped, f, protocol=pickle.HIGHEST_PROTOCOL)
+    manifest = {
+        "format": FORMAT_NAME,
+        "version": FORMAT_VERSION,
+        "created": time.time(),
+        "components": sorted(stripped),
+        "arrays": {key: {"file": f"{key}.npy", "dtype": array.dtype.str, "shape": list(array.shape)}
+                   for key, array in arrays.items()},
+        "libraries": _library_versions(),
+        "metadata": metadata or {},
+    }
+    with open(os.path.join(tmp_path, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    if os.path.exists(path):
+        shutil.rmtree(path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_manifest(path):
+    """The manifest of the artifact at `path`; raises ValueError for other formats or newer versions."""
+    with open(os.path.join(path, MANIFEST_FILE), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != FORMAT_NAME:
+        raise ValueError(f"{path} is not a {FORMAT_NAME} artifact")
+    if manifest.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"{path} has format version {manifest['version']}; "
+                         f"this code reads up to version {FORMAT_VERSION}")
+    return manifest
+
+
+def load_pipeline(path, mmap=True):
+    """FraudPipeline stored at `path`; array sections are memory-mapped read-only unless mmap=False.
+
+    The estimator state is unpickled, so only load artifacts written by
+    save_pipeline on a trusted machine.
+    """
+    manifest = read_manifest(path)
+    saved_versions = manifest.get("libraries", {})
+    for library, version in _library_versions().items():
+        if saved_versions.get(library, version) != version:
+            print(f" Model artifact was saved with {library} {saved_versions[library]}, running {version}")
+    with open(os.path.join(path, ESTIMATORS_FILE), "rb") as f:
+        components = pickle.load(f)
+    for key, section in manifest["arrays"].items():
+        name, attr = key.split(".", 1)
+        array = np.load(os.path.join(path, section["file"]), mmap_mode="r" if mmap else None)
+        setattr(components[name], attr, array)
+    return FraudPipeline(metadata=manifest["metadata"], manifest=manifest, **components)
+
+
+def list_pipelines(model_dir=MODEL_DIR):
+    """[(name, manifest)] of the readable artifacts under model_dir, newest first."""
+    found = []
+    if os.path.isdir(model_dir):
+        for name in os.listdir(model_dir):
+            try:
+                found.append((name, read_manifest(os.path.join(model_dir, name))))
+            except Exception:
+                continue
+    return sorted(found, key=lambda item: item[1].get("created", 0), reverse=True)
+
+
+class FraudPipeline:
+    """Fitted preprocessing plus the classical and/or quantum SVM, scored on raw transaction features."""
+
+    def __init__(self, scaler=None, pca=None, classical=None, quantum=None, metadata=None, manifest=None):
+        self.scaler = scaler
+        self.pca = pca
+        self.classical = classical
+        self.quantum = quantum
+        self.metadata = metadata or {}
+        self.manifest = manifest
+
+    @property
+    def models(self):
+        """Names of the fitted models this pipeline can score with."""
+        return [name for name in ("quantum", "classical") if getattr(self, name) is not None]
+
+    def reduce(self, X):
+        """Apply the fitted scaler/PCA (no refitting)."""
+        if self.scaler is not None:
+            X = self.scaler.transform(X)
+        if self.pca is not None:
+            X = self.pca.transform(X)
+        return np.asarray(X, dtype=float)
+
+    def score(self, X, model=None):
+        """(predictions, class probabilities) of `model` ("quantum" / "classical"; default the first available)."""
+        model = model or self.models[0]
+        X_reduced = self.reduce(X)
+        if model == "quantum":
+            return self.quantum.predict_with_proba(X_reduced)
+        if model == "classical":
+            return self.classical.predict(X_reduced), self.classical.predict_proba(X_reduced)
+        raise ValueError(f"Unknown model '{model}'. Expected one of {self.models}")
+
+    def save(self, path):
+        return save_pipeline(path, scaler=self.scaler, pca=self.pca, classical=self.classical,
+                             quantum=self.quantum, metadata=self.metadata)
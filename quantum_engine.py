@@ -0,0 +1,579 @@
+"""quantum_engine.py
+
+Batched NumPy statevector simulation of the RY/CNOT quantum feature map used
+by the Quantum SVM. Instead of building one Qiskit circuit per transaction,
+every gate layer is applied to a whole (n_samples, 2**n_qubits) complex array
+at once. Qiskit is kept as an optional cross-check backend and is imported
+lazily so this module works with NumPy alone.
+"""
+import os
+import tempfile
+import threading
+import functools
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+ENGINES = ("numpy", "qiskit")
+DEFAULT_ENGINE = "numpy"
+
+# Statevector dtype per precision mode; kernels and expectations follow the matching real dtype
+PRECISIONS = {"double": np.complex128, "single": np.complex64}
+DEFAULT_PRECISION = "double"
+
+# Rows simulated per chunk; bounds the size of the temporaries in the RY layers
+DEFAULT_BATCH_SIZE = 65536
+
+# Largest supported register; 2**20 amplitudes are 16 MB per complex128 statevector
+MAX_QUBITS = 20
+
+# Memory plan_simulation may use for statevectors and simulation temporaries
+DEFAULT_MEMORY_BUDGET = 1024 * 1024 * 1024
+
+# Statevector arrays that do not fit the budget are spilled to disk-backed memmaps here
+STATE_SPILL_DIR = os.path.join(os.path.dirname(__file__), "static", "uploads", "state_spill")
+
+# Basis states per block when Z sign masks would be too large to build at once
+MASK_BLOCK_SIZE = 1 << 14
+
+# Probability rows materialised at a time by pauli_z_expectations
+EXPECTATION_CHUNK_BYTES = 64 * 1024 * 1024
+
+# Registers from this size up are worth sharding across worker processes
+PARALLEL_MIN_QUBITS = 12
+
+
+def feature_map_ops(n_qubits, reps=1):
+    """Gate list of the feature map, mirroring quantum_feature_map_qiskit.
+
+    Each entry is ("ry", qubit, angle_scale) or ("cx", control, target). The
+    RY / CNOT / RY / CNOT block is repeated `reps` times; reps=1 is the
+    original map.
+    """
+    ops = []
+    for _ in range(reps):
+        # First layer: RY rotations (encode features)
+        for i in range(n_qubits):
+            ops.append(("ry", i, 1.0))
+        # First entanglement: linear CNOT chain
+        for i in range(n_qubits - 1):
+            ops.append(("cx", i, i + 1))
+        # Second layer: parametric RY rotations
+        for i in range(n_qubits):
+            ops.append(("ry", i, 0.5))
+        # Second entanglement: cyclic CNOT
+        for i in range(n_qubits - 1):
+            ops.append(("cx", i, (i + 1) % n_qubits))
+    return tuple(ops)
+
+
+def _cx_permutation(n_qubits, control, target):
+    """Index permutation of a CNOT in Qiskit's little-endian basis ordering."""
+    idx = np.arange(2 ** n_qubits)
+    return np.where((idx >> control) & 1, idx ^ (1 << target), idx)
+
+
+def compile_ops(n_qubits, ops=None, reps=1):
+    """Fuse consecutive CNOTs into a single gather permutation.
+
+    Returns a list of ("ry", qubit, scale) and ("perm", index_array) steps.
+    """
+    ops = feature_map_ops(n_qubits, reps) if ops is None else ops
+    compiled = []
+    perm = None
+    for op in ops:
+        if op[0] == "cx":
+            p = _cx_permutation(n_qubits, op[1], op[2])
+            # Applying p after perm gathers through perm[p]
+            perm = p if perm is None else perm[p]
+            continue
+        if perm is not None:
+            compiled.append(("perm", perm))
+            perm = None
+        compiled.append(op)
+    if perm is not None:
+        compiled.append(("perm", perm))
+    return compiled
+
+
+def state_dtype(precision=DEFAULT_PRECISION):
+    """Complex statevector dtype for a precision mode ("double" or "single")."""
+    if precision not in PRECISIONS:
+        raise ValueError(f"Unknown precision '{precision}'. Expected one of {tuple(PRECISIONS)}")
+    return np.dtype(PRECISIONS[precision])
+
+
+def _apply_ry(states, qubit, theta):
+    """Apply RY(theta[k]) on `qubit` to every row k of `states` in place."""
+    n, dim = states.shape
+    view = states.reshape(n, dim // (2 << qubit), 2, 1 << qubit)
+    # Rotation coefficients in the states' own precision so single precision stays single
+    real_dtype = np.finfo(states.dtype).dtype
+    c = np.cos(theta / 2).astype(real_dtype)[:, None, None]
+    s = np.sin(theta / 2).astype(real_dtype)[:, None, None]
+    s0 = view[:, :, 0, :].copy()
+    s1 = view[:, :, 1, :]
+    view[:, :, 0, :] = c * s0 - s * s1
+    view[:, :, 1, :] = s * s0 + c * s1
+
+
+def _simulate_numpy(angles, compiled, dtype):
+    n, n_qubits = angles.shape
+    states = np.zeros((n, 2 ** n_qubits), dtype=dtype)
+    states[:, 0] = 1.0
+    for step in compiled:
+        if step[0] == "ry":
+            _apply_ry(states, step[1], angles[:, step[1]] * step[2])
+        else:
+            # Column gathers can come back Fortran-ordered; keep rows contiguous
+            states = np.ascontiguousarray(states[:, step[1]])
+    return states
+
+
+def circuit_from_ops(angles_row, ops=None, reps=1):
+    """Build a Qiskit QuantumCircuit for one padded angle vector."""
+    from qiskit import QuantumCircuit
+
+    n_qubits = len(angles_row)
+    ops = feature_map_ops(n_qubits, reps) if ops is None else ops
+    qc = QuantumCircuit(n_qubits, name='QuantumFeatureMap')
+    for op in ops:
+        if op[0] == "ry":
+            qc.ry(float(angles_row[op[1]]) * op[2], op[1])
+        else:
+            qc.cx(op[1], op[2])
+    return qc
+
+
+@functools.lru_cache(maxsize=None)
+def feature_map_template(n_qubits, reps=1):
+    """Parameterised feature-map circuit over ParameterVector("x", n_qubits), built once per (qubits, reps).
+
+    Bind one padded angle row with template.assign_parameters(row); this is
+    several times faster than building the circuit gate by gate. The cached
+    template is shared, so callers must not modify it in place.
+    """
+    from qiskit import QuantumCircuit
+    from qiskit.circuit import ParameterVector
+
+    x = ParameterVector("x", n_qubits)
+    qc = QuantumCircuit(n_qubits, name='QuantumFeatureMap')
+    for op in feature_map_ops(n_qubits, reps):
+        if op[0] == "ry":
+            qc.ry(x[op[1]] if op[2] == 1.0 else x[op[1]] * op[2], op[1])
+        else:
+            qc.cx(op[1], op[2])
+    return qc
+
+
+def feature_map_circuits(angles, reps=1):
+    """One bound feature-map circuit per row of padded angles."""
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    template = feature_map_template(angles.shape[1], reps)
+    return [template.assign_parameters(row) for row in angles]
+
+
+def _simulate_qiskit(angles, dtype, reps=1, out=None):
+    from qiskit.quantum_info import Statevector
+
+    n, n_qubits = angles.shape
+    states = np.empty((n, 2 ** n_qubits), dtype=dtype) if out is None else out
+    template = feature_map_template(n_qubits, reps)
+    for k in range(n):
+        states[k] = Statevector.from_instruction(template.assign_parameters(angles[k])).data
+    return states
+
+
+def plan_simulation(n_samples, n_qubits, memory_budget=DEFAULT_MEMORY_BUDGET, dtype=np.complex128):
+    """Pick the simulation path for a register size so scaling studies stay within memory_budget.
+
+    "dense": the whole (n_samples, 2**n_qubits) array plus the RY/CNOT
+    temporaries fits, so every sample is simulated in one batched pass.
+    "per-sample": only `batch_size` samples (down to a single one) are
+    simulated at a time, and when the result itself does not fit in half the
+    budget it is written to a disk-backed memmap (`out_of_core`).
+    """
+    if not 1 <= n_qubits <= MAX_QUBITS:
+        raise ValueError(f"n_qubits must be between 1 and {MAX_QUBITS}, got {n_qubits}")
+    state_bytes = (2 ** n_qubits) * np.dtype(dtype).itemsize
+    total_bytes = n_samples * state_bytes
+    if total_bytes * 3 <= memory_budget:
+        return {"path": "dense", "batch_size": DEFAULT_BATCH_SIZE, "state_bytes": state_bytes,
+                "total_bytes": total_bytes, "out_of_core": False}
+    batch_size = int(min(DEFAULT_BATCH_SIZE, max(1, memory_budget // (4 * state_bytes))))
+    return {"path": "per-sample", "batch_size": batch_size, "state_bytes": state_bytes,
+            "total_bytes": total_bytes, "out_of_core": total_bytes * 2 > memory_budget}
+
+
+def spill_array(shape, dtype=np.complex128, spill_dir=STATE_SPILL_DIR):
+    """Anonymous disk-backed array (deleted automatically once it is released)."""
+    os.makedirs(spill_dir, exist_ok=True)
+    return np.memmap(tempfile.TemporaryFile(dir=spill_dir), dtype=dtype, mode="w+", shape=shape)
+
+
+def simulate_statevectors(angles, engine=DEFAULT_ENGINE, batch_size=DEFAULT_BATCH_SIZE, dtype=np.complex128,
+                          reps=1, out=None):
+    """Statevectors of the feature map for every row of `angles`.
+
+    `angles` is an (n_samples, n_qubits) array of already normalised and padded
+    rotation angles. Returns an (n_samples, 2**n_qubits) complex array whose
+    basis ordering matches qiskit.quantum_info.Statevector. `out` may be a
+    preallocated (e.g. memory-mapped) array to fill batch by batch.
+    """
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}'. Expected one of {ENGINES}")
+    if engine == "qiskit":
+        return _simulate_qiskit(angles, dtype, reps, out)
+
+    n, n_qubits = angles.shape
+    compiled = compile_ops(n_qubits, reps=reps)
+    if n <= batch_size and out is None:
+        return _simulate_numpy(angles, compiled, dtype)
+    states = np.empty((n, 2 ** n_qubits), dtype=dtype) if out is None else out
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        states[start:stop] = _simulate_numpy(angles[start:stop], compiled, dtype)
+    return states
+
+
+def _attach_output(target, shape, dtype):
+    """Open the parent's output buffer: ("shm", name) shared memory or ("file", path) memmap."""
+    kind, name = target
+    if kind == "shm":
+        shm = shared_memory.SharedMemory(name=name)
+        return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    return None, np.memmap(name, dtype=dtype, mode="r+", shape=shape)
+
+
+def _simulate_shard(target, shape, dtype_str, angles, start, reps, batch_size, output, correlators,
+                    state_dtype_str=None):
+    """Worker: simulate one shard of angle rows and write it into the shared output at row `start`."""
+    shm, result = _attach_output(target, shape, np.dtype(dtype_str))
+    try:
+        compiled = compile_ops(angles.shape[1], reps=reps)
+        states_dtype = np.dtype(state_dtype_str) if state_dtype_str else result.dtype
+        for b0 in range(0, len(angles), batch_size):
+            b1 = min(b0 + batch_size, len(angles))
+            states = _simulate_numpy(angles[b0:b1], compiled, states_dtype)
+            if output == "expectations":
+                states = pauli_z_expectations(states, correlators=correlators)
+            result[start + b0:start + b1] = states
+        if shm is None:
+            result.flush()
+    finally:
+        del result
+        if shm is not None:
+            shm.close()
+    return len(angles)
+
+
+def simulate_parallel(angles, n_workers=None, reps=1, batch_size=DEFAULT_BATCH_SIZE, dtype=np.complex128,
+                      output="states", correlators=False, out_of_core=False):
+    """Shard the angle rows across a process pool; results come back through shared memory.
+
+    output="states" returns the (n, 2**n_qubits) statevectors, "expectations"
+    only the Pauli-Z (and optionally ZZ) features, so wide registers never
+    hold every statevector at once. Workers write straight into a
+    multiprocessing.shared_memory block (or, with out_of_core, a memmap file
+    under STATE_SPILL_DIR) instead of pickling their results; only the small
+    angle shards are sent to them. batch_size is per worker.
+    """
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    n, n_qubits = angles.shape
+    n_workers = max(1, min(int(n_workers or os.cpu_count() or 1), n))
+    states_dtype = np.dtype(dtype)
+    if output == "states":
+        shape, dtype = (n, 2 ** n_qubits), states_dtype
+    else:
+        n_obs = n_qubits
+        if correlators and n_qubits > 1:
+            n_obs += n_qubits * (n_qubits - 1) // 2
+        shape, dtype, out_of_core = (n, n_obs), np.finfo(states_dtype).dtype, False
+    nbytes = max(1, int(np.prod(shape)) * dtype.itemsize)
+
+    shm = None
+    if out_of_core:
+        os.makedirs(STATE_SPILL_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=STATE_SPILL_DIR, suffix=".dat")
+        os.close(fd)
+        result = np.memmap(path, dtype=dtype, mode="w+", shape=shape)
+        target = ("file", path)
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        target = ("shm", shm.name)
+
+    try:
+        bounds = np.linspace(0, n, n_workers + 1).astype(int)
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            futures = [pool.submit(_simulate_shard, target, shape, dtype.str, angles[a:b], a, reps, batch_size,
+                                   output, correlators, states_dtype.str)
+                       for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+            for future in futures:
+                future.result()
+        if shm is not None:
+            result = np.ndarray(shape, dtype=dtype, buffer=shm.buf).copy()
+    finally:
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+
+    if out_of_core:
+        result = np.memmap(path, dtype=dtype, mode="r+", shape=shape)
+        try:
+            # The open mapping keeps the data alive; on Windows the file stays until released
+            os.remove(path)
+        except OSError:
+            pass
+    return result
+
+
+def cross_check_engines(angles, atol=1e-10, reps=1):
+    """Compare the NumPy engine against Qiskit on the given angles.
+
+    Returns (max_abs_deviation, within_tolerance).
+    """
+    ref = simulate_statevectors(angles, engine="qiskit", reps=reps)
+    fast = simulate_statevectors(angles, engine="numpy", reps=reps)
+    deviation = float(np.max(np.abs(ref - fast))) if ref.size else 0.0
+    return deviation, deviation <= atol
+
+
+def z_sign_masks(n_qubits, correlators=False, start=0, stop=None, basis=None):
+    """Precomputed +/-1 sign masks of the Z observables over the computational basis.
+
+    Returns a (2**n_qubits, n_observables) array (or only the basis rows
+    start:stop, or the rows of the explicit basis indices `basis`, e.g. the
+    measured outcomes of a shot-based run). Single-qubit columns follow the
+    Pauli label order used by get_expectation_z (column i is Z on qubit
+    n_qubits - 1 - i); with correlators=True the ZZ columns for every label
+    pair (i, j), i < j, are appended.
+    """
+    if basis is not None:
+        idx = np.asarray(basis, dtype=np.int64)
+    else:
+        idx = np.arange(start, 2 ** n_qubits if stop is None else stop)
+    qubits = np.arange(n_qubits)[::-1]
+    signs = 1.0 - 2.0 * ((idx[:, None] >> qubits[None, :]) & 1)
+    if correlators and n_qubits > 1:
+        i, j = np.triu_indices(n_qubits, k=1)
+        signs = np.hstack([signs, signs[:, i] * signs[:, j]])
+    return signs
+
+
+def _probabilities(states):
+    return states.real ** 2 + states.imag ** 2 if np.iscomplexobj(states) else states ** 2
+
+
+def pauli_z_expectations(states, correlators=False, masks=None):
+    """<Z_i> (and optionally <Z_i Z_j>) for every row of a statevector array.
+
+    One pass over the probability array: probabilities @ sign masks. Large
+    registers are processed in row chunks, and the sign masks are built one
+    basis block at a time, so memory stays bounded up to MAX_QUBITS.
+    """
+    states = np.atleast_2d(states)
+    n, dim = states.shape
+    n_qubits = int(np.log2(dim))
+    if masks is None and dim <= MASK_BLOCK_SIZE:
+        masks = z_sign_masks(n_qubits, correlators=correlators)
+    if masks is not None and n * dim * 8 <= EXPECTATION_CHUNK_BYTES:
+        probs = _probabilities(states)
+        return probs @ masks.astype(probs.dtype, copy=False)
+
+    n_obs = n_qubits + (n_qubits * (n_qubits - 1) // 2 if correlators and n_qubits > 1 else 0)
+    if masks is not None:
+        n_obs = masks.shape[1]
+    out = np.zeros((n, n_obs), dtype=np.finfo(states.dtype).dtype)
+    rows = max(1, EXPECTATION_CHUNK_BYTES // (dim * 8))
+    for r0 in range(0, n, rows):
+        probs = _probabilities(np.asarray(states[r0:r0 + rows]))
+        if masks is not None:
+            out[r0:r0 + rows] = probs @ masks.astype(probs.dtype, copy=False)
+            continue
+        for b0 in range(0, dim, MASK_BLOCK_SIZE):
+            b1 = min(b0 + MASK_BLOCK_SIZE, dim)
+            out[r0:r0 + rows] += probs[:, b0:b1] @ z_sign_masks(n_qubits, correlators, b0, b1).astype(probs.dtype)
+    return out
+
+
+def normalize_features(X, bounds=None):
+    """Scale features to [0, pi] rotation angles.
+
+    `bounds` is an (X_min, X_range) pair; when omitted it is taken from X.
+    Returns (X_norm, bounds) so the same scaling can be reused later.
+    """
+    X = np.atleast_2d(np.asarray(X, dtype=float))
+    if bounds is None:
+        X_min = np.min(X, axis=0)
+        X_range = np.max(X, axis=0) - X_min
+        X_range[X_range == 0] = 1  # Avoid division by zero
+        bounds = (X_min, X_range)
+    X_min, X_range = bounds
+    return (X - X_min) / X_range * np.pi, bounds
+
+
+def pad_to_qubits(X_norm, n_qubits):
+    """Zero-pad (or truncate) every row to exactly n_qubits angles."""
+    X_norm = np.atleast_2d(X_norm)
+    if X_norm.shape[1] < n_qubits:
+        return np.hstack([X_norm, np.zeros((X_norm.shape[0], n_qubits - X_norm.shape[1]))])
+    return np.ascontiguousarray(X_norm[:, :n_qubits])
+
+
+class QuantumStates:
+    """One simulation pass over a dataset, shared by every quantum pipeline stage.
+
+    Holds the padded angles, the statevectors and the normalisation bounds;
+    expectation features are derived from the stored statevectors on demand
+    (or seeded via `expectations`, a {correlators: features} dict).
+    """
+
+    def __init__(self, angles, states, bounds, n_qubits, expectations=None, reps=1, plan=None):
+        self.angles = angles
+        self.states = states
+        self.bounds = bounds
+        self.n_qubits = n_qubits
+        self.reps = reps
+        self.plan = plan
+        self._expectations = dict(expectations or {})
+
+    def __len__(self):
+        return len(self.states)
+
+    def expectations(self, correlators=False):
+        """Pauli-Z (and optionally ZZ) expectation features, computed once per flavour."""
+        if correlators not in self._expectations:
+            self._expectations[correlators] = pauli_z_expectations(self.states, correlators=correlators)
+        return self._expectations[correlators]
+
+
+class StatevectorCache:
+    """Process-wide LRU cache of feature-map statevectors.
+
+    Keyed by the padded angle vector quantised to `tolerance` radians, so rows
+    whose angles agree to within the tolerance share one simulation. Memory is
+    bounded by `max_bytes` (statevector plus key bytes, approximately); the
+    least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, tolerance=1e-9):
+        self.max_bytes = max_bytes
+        self.tolerance = tolerance
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_bytes=None, tolerance=None):
+        """Change the limits; a new tolerance invalidates every existing key."""
+        with self._lock:
+            if tolerance is not None and tolerance != self.tolerance:
+                self.tolerance = tolerance
+                self._entries.clear()
+                self._bytes = 0
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries), "bytes": self._bytes}
+
+    def _keys(self, angles, context):
+        quantised = np.round(angles / self.tolerance).astype(np.int64)
+        prefix = repr(context).encode()
+        return [prefix + row.tobytes() for row in quantised]
+
+    def _evict(self):
+        while self._bytes > self.max_bytes and self._entries:
+            key, state = self._entries.popitem(last=False)
+            self._bytes -= state.nbytes + len(key)
+
+    def simulate(self, angles, engine=DEFAULT_ENGINE, dtype=np.complex128, reps=1):
+        """simulate_statevectors with cached rows reused and only the misses simulated."""
+        angles = np.atleast_2d(np.asarray(angles, dtype=float))
+        n, n_qubits = angles.shape
+        states = np.empty((n, 2 ** n_qubits), dtype=dtype)
+        keys = self._keys(angles, (engine, np.dtype(dtype).str, reps))
+
+        missing = []
+        with self._lock:
+            for k, key in enumerate(keys):
+                state = self._entries.get(key)
+                if state is None:
+                    missing.append(k)
+                else:
+                    self._entries.move_to_end(key)
+                    states[k] = state
+            self.hits += n - len(missing)
+            self.misses += len(missing)
+
+        if missing:
+            states[missing] = simulate_statevectors(angles[missing], engine=engine, dtype=dtype, reps=reps)
+            with self._lock:
+                for k in missing:
+                    if keys[k] not in self._entries:
+                        state = states[k].copy()
+                        self._entries[keys[k]] = state
+                        self._bytes += state.nbytes + len(keys[k])
+                self._evict()
+        return states
+
+
+# Shared by every caller in the process (Streamlit reruns reuse imported modules)
+STATEVECTOR_CACHE = StatevectorCache()
+
+
+def prepare_quantum_states(X, n_qubits=4, bounds=None, engine=DEFAULT_ENGINE, cache=None, reps=1,
+                           memory_budget=DEFAULT_MEMORY_BUDGET, n_workers=1, precision=DEFAULT_PRECISION):
+    """Normalise, pad and simulate X exactly once. Returns a QuantumStates.
+
+    Pass a StatevectorCache (e.g. STATEVECTOR_CACHE) to reuse earlier simulations.
+    The path (dense batch vs per-sample / out-of-core) comes from
+    plan_simulation and is recorded on the result; the cache is only used on
+    the dense path. With n_workers > 1, registers of PARALLEL_MIN_QUBITS or
+    more are simulated on a process pool (simulate_parallel). precision="single"
+    simulates in complex64, halving memory for statevectors and kernels.
+    """
+    X_norm, bounds = normalize_features(X, bounds)
+    angles = pad_to_qubits(X_norm, n_qubits)
+    dtype = state_dtype(precision)
+    plan = plan_simulation(len(angles), n_qubits, memory_budget, dtype=dtype)
+    if n_workers > 1 and engine == "numpy" and n_qubits >= PARALLEL_MIN_QUBITS:
+        # Every worker holds its own batch of temporaries
+        plan = dict(plan, path=plan["path"] + " (parallel)", n_workers=n_workers,
+                    batch_size=max(1, plan["batch_size"] // n_workers))
+        states = simulate_parallel(angles, n_workers=n_workers, reps=reps, batch_size=plan["batch_size"],
+                                   dtype=dtype, out_of_core=plan["out_of_core"])
+    elif plan["path"] == "dense" and cache is not None:
+        states = cache.simulate(angles, engine=engine, dtype=dtype, reps=reps)
+    else:
+        out = spill_array((len(angles), 2 ** n_qubits), dtype=dtype) if plan["out_of_core"] else None
+        states = simulate_statevectors(angles, engine=engine, batch_size=plan["batch_size"], dtype=dtype, reps=reps,
+                                       out=out)
+    return QuantumStates(angles, states, bounds, n_qubits, reps=reps, plan=plan)
+
+
+def deduplicate_rows(X, y=None):
+    """Unique rows of X (paired with their label when y is given).
+
+    Returns (unique_index, inverse, counts): X[unique_index] are the unique
+    rows, X[unique_index][inverse] reproduces X row for row, and counts holds
+    how many transactions share each unique row.
+    """
+    key = np.atleast_2d(np.asarray(X, dtype=float))
+    if y is not None:
+        key = np.column_stack([key, np.asarray(y, dtype=float)])
+    _, unique_index, inverse, counts = np.unique(key, axis=0, return_index=True, return_inverse=True,
+                                                 return_counts=True)
+    return unique_index, inverse.ravel(), counts
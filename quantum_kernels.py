@@ -0,0 +1,702 @@
+"""quantum_kernels.py
+
+Kernel builders for the Quantum SVM working directly on statevector arrays.
+The fidelity kernel |<psi_i|psi_j>|^2 is computed as |S_a . S_b^H|^2 with
+BLAS matrix products, one row tile at a time so temporaries stay bounded.
+Large Gram matrices can be written tile by tile to a memory-mapped file, and
+finished matrices and tiles can be kept in a content-addressed disk cache.
+Symmetric Gram matrices can also be built and stored as their packed upper
+triangle (n(n+1)/2 entries) and only expanded when handed to the SVM.
+"""
+import os
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from threadpoolctl import threadpool_limits
+except Exception:
+    threadpool_limits = None
+
+# Rows per tile; a tile pair needs tile_size**2 overlap entries of scratch space
+DEFAULT_TILE_SIZE = 2048
+
+# Upper bound on the statevector bytes of one row tile; large registers get fewer rows per tile
+TILE_MEMORY_BYTES = 256 * 1024 * 1024
+
+# Density-matrix features have 4**n_qubits dimensions; beyond this they are impractical
+MAX_DENSITY_QUBITS = 7
+
+# Threads that compute kernel tiles concurrently (BLAS releases the GIL); None means every core
+DEFAULT_KERNEL_WORKERS = 1
+
+# With several workers, shrink tiles (not below this) until there are this many tiles per worker
+MIN_PARALLEL_TILE_SIZE = 256
+TILES_PER_WORKER = 4
+
+# Below this statevector dimension, recomputing a grown Gram matrix is cheaper than scattering the reused entries
+INCREMENTAL_MIN_STATE_DIM = 1024
+
+KERNEL_CACHE_DIR = os.path.join(os.path.dirname(__file__), "static", "uploads", "kernel_cache")
+
+# Content-addressed kernel matrices live here, capped at KERNEL_CACHE_MAX_BYTES
+KERNEL_BLOCK_CACHE_DIR = os.path.join(KERNEL_CACHE_DIR, "blocks")
+KERNEL_CACHE_MAX_BYTES = 512 * 1024 * 1024
+# Kernel tiles have their own budget, so a build's tiles never evict the finished matrices
+KERNEL_TILE_CACHE_DIR = os.path.join(KERNEL_BLOCK_CACHE_DIR, "tiles")
+KERNEL_TILE_CACHE_MAX_BYTES = 128 * 1024 * 1024
+
+# Finished out-of-core (memmap) kernels kept in KERNEL_CACHE_DIR; older ones are deleted
+MEMMAP_KERNELS_KEEP = 2
+# Unfinished memmap kernels not written to for this long are treated as abandoned builds
+MEMMAP_ABANDONED_SECONDS = 24 * 3600
+
+
+def _as_real_if_possible(states):
+    """The RY/CNOT feature map only produces real amplitudes; use real GEMM then.
+
+    Disk-backed (memmap) statevectors are left as they are so they are only
+    read tile by tile.
+    """
+    if isinstance(states, np.memmap):
+        return states
+    states = np.asarray(states)
+    if np.iscomplexobj(states) and not np.any(states.imag):
+        return np.ascontiguousarray(states.real)
+    return states
+
+
+def kernel_dtype(states):
+    """Kernel entries share the statevectors' real precision: float32 for complex64, else float64."""
+    return np.dtype(np.float32) if np.finfo(np.asarray(states[:0]).dtype).dtype == np.float32 else np.dtype(np.float64)
+
+
+def _tile_rows(states, tile_size):
+    """tile_size, reduced so one row tile of these statevectors stays within TILE_MEMORY_BYTES."""
+    row_bytes = max(1, states.shape[1] * states.itemsize)
+    return int(max(1, min(int(tile_size), TILE_MEMORY_BYTES // row_bytes)))
+
+
+def _hash_array(h, array, chunk_bytes=64 * 1024 * 1024):
+    """Feed shape, dtype and contents of array to hashlib object h, a row chunk at a time."""
+    h.update(str((array.shape, array.dtype.str)).encode())
+    rows = max(1, chunk_bytes // max(1, array[:1].nbytes))
+    for start in range(0, max(1, len(array)), rows):
+        h.update(np.ascontiguousarray(array[start:start + rows]).tobytes())
+
+
+def _fidelity_block(a, b):
+    overlap = a.conj() @ b.T
+    if np.iscomplexobj(overlap):
+        return overlap.real ** 2 + overlap.imag ** 2
+    return overlap ** 2
+
+
+def resolve_workers(n_jobs):
+    """Worker count for n_jobs: None or <= 0 means one per CPU core."""
+    if n_jobs is None or n_jobs <= 0:
+        return os.cpu_count() or 1
+    return int(n_jobs)
+
+
+@contextmanager
+def _single_threaded_blas(n_jobs):
+    """Pin BLAS to one thread while n_jobs tile threads run, to avoid oversubscribing the cores."""
+    if n_jobs > 1 and threadpool_limits is not None:
+        with threadpool_limits(limits=1, user_api="blas"):
+            yield
+    else:
+        yield
+
+
+def _tile_pairs(n_a, n_b, tile_size, symmetric):
+    """(i0, j0) tile origins; only the upper triangle for a symmetric kernel."""
+    return [(i0, j0) for i0 in range(0, n_a, tile_size)
+            for j0 in range(i0 if symmetric else 0, n_b, tile_size)]
+
+
+def _balanced_tile_size(n_a, n_b, tile_size, symmetric, n_jobs):
+    """Shrink tiles until every worker gets about TILES_PER_WORKER of them."""
+    while tile_size > MIN_PARALLEL_TILE_SIZE and \
+            len(_tile_pairs(n_a, n_b, tile_size, symmetric)) < TILES_PER_WORKER * n_jobs:
+        tile_size = max(MIN_PARALLEL_TILE_SIZE, tile_size // 2)
+    return tile_size
+
+
+def run_tiles(compute_tile, pairs, n_jobs=DEFAULT_KERNEL_WORKERS):
+    """Call compute_tile(i0, j0) for every tile, on a thread pool when n_jobs > 1.
+
+    Tiles write disjoint blocks of the output, so no locking is needed; BLAS
+    releases the GIL so the GEMMs run concurrently.
+    """
+    n_jobs = min(resolve_workers(n_jobs), max(1, len(pairs)))
+    if n_jobs == 1:
+        for i0, j0 in pairs:
+            compute_tile(i0, j0)
+        return
+    with _single_threaded_blas(n_jobs), ThreadPoolExecutor(max_workers=n_jobs) as pool:
+        for future in [pool.submit(compute_tile, i0, j0) for i0, j0 in pairs]:
+            future.result()
+
+
+def packed_size(n):
+    """Number of entries in the packed upper triangle (diagonal included) of an n x n matrix."""
+    return n * (n + 1) // 2
+
+
+def packed_dim(size):
+    """n for a packed upper triangle of `size` entries."""
+    n = int((np.sqrt(8 * size + 1) - 1) // 2)
+    while packed_size(n) < size:
+        n += 1
+    if packed_size(n) != size:
+        raise ValueError(f"{size} entries is not a packed upper triangle")
+    return n
+
+
+def packed_row_offset(n, i):
+    """Index of K[i, i] in the row-major packed upper triangle of an n x n matrix."""
+    return i * n - i * (i - 1) // 2
+
+
+def pack_upper(K):
+    """Row-major packed upper triangle of a square symmetric matrix (1-D, n(n+1)/2 entries)."""
+    n = len(K)
+    packed = np.empty(packed_size(n), dtype=K.dtype)
+    for i in range(n):
+        offset = packed_row_offset(n, i)
+        packed[offset:offset + n - i] = K[i, i:]
+    return packed
+
+
+def unpack_upper(packed, block_size=512):
+    """Expand a packed upper triangle into the full symmetric (n, n) matrix.
+
+    Rows are copied from the packed buffer, then the lower triangle is
+    mirrored one block column at a time so the transposes stay cache sized.
+    """
+    packed = np.asarray(packed)
+    n = packed_dim(len(packed))
+    K = np.empty((n, n), dtype=packed.dtype)
+    for i in range(n):
+        offset = packed_row_offset(n, i)
+        K[i, i:] = packed[offset:offset + n - i]
+    for i0 in range(0, n, block_size):
+        i1 = min(i0 + block_size, n)
+        K[i0:i1, :i0] = K[:i0, i0:i1].T
+        diag = K[i0:i1, i0:i1]
+        lower = np.tril_indices(i1 - i0, k=-1)
+        diag[lower] = diag.T[lower]
+    return K
+
+
+def fidelity_kernel(states_a, states_b=None, tile_size=DEFAULT_TILE_SIZE, cache=None, n_jobs=DEFAULT_KERNEL_WORKERS,
+                    packed=False):
+    """Fidelity kernel K[i, j] = |<a_i|b_j>|^2 between two statevector arrays.
+
+    With `states_b` omitted the symmetric Gram matrix of `states_a` is built
+    from upper-triangle tiles only and mirrored into the lower triangle, or,
+    with packed=True, returned as its packed upper triangle (see
+    unpack_upper) without ever allocating the full matrix.
+    With a KernelCache, every tile is looked up by the hash of its row and
+    column statevectors before it is computed, and stored afterwards.
+    n_jobs threads compute tiles concurrently (None = all cores).
+    """
+    a = _as_real_if_possible(states_a)
+    symmetric = states_b is None
+    if packed and not symmetric:
+        raise ValueError("Only a symmetric Gram matrix (states_b=None) can be packed")
+    b = a if symmetric else _as_real_if_possible(states_b)
+    n_a, n_b = len(a), len(b)
+    dtype = np.promote_types(kernel_dtype(a), kernel_dtype(b))
+    K = np.empty(packed_size(n_a) if packed else (n_a, n_b), dtype=dtype)
+    n_jobs = resolve_workers(n_jobs)
+    tile_size = _tile_rows(a, tile_size)
+    if n_jobs > 1:
+        tile_size = _balanced_tile_size(n_a, n_b, tile_size, symmetric, n_jobs)
+    if cache is not None:
+        row_keys = {i0: cache.key(a[i0:i0 + tile_size]) for i0 in range(0, n_a, tile_size)}
+        col_keys = row_keys if symmetric else {j0: cache.key(b[j0:j0 + tile_size]) for j0 in range(0, n_b, tile_size)}
+
+    def compute_tile(i0, j0):
+        i1, j1 = min(i0 + tile_size, n_a), min(j0 + tile_size, n_b)
+        block = None
+        if cache is not None:
+            block_key = cache.key("fidelity_tile", row_keys[i0], col_keys[j0])
+            block = cache.get(block_key)
+        if block is None:
+            block = _fidelity_block(a[i0:i1], b[j0:j1])
+            if cache is not None:
+                cache.put(block_key, block)
+        if packed:
+            for i in range(i0, i1):
+                start = max(i, j0)
+                offset = packed_row_offset(n_a, i) + start - i
+                K[offset:offset + j1 - start] = block[i - i0, start - j0:]
+            return
+        K[i0:i1, j0:j1] = block
+        if symmetric and j0 != i0:
+            K[j0:j1, i0:i1] = block.T
+
+    run_tiles(compute_tile, _tile_pairs(n_a, n_b, tile_size, symmetric), n_jobs)
+    return K
+
+
+
+class KernelCache:
+    """Content-addressed on-disk cache of kernel matrices and kernel tiles.
+
+    Entries are .npy files named by the sha1 of their inputs (see key()), so
+    identical statevectors always map to the same file. A hit refreshes the
+    file's modification time. Before an entry is written, the least recently
+    used entries are deleted to make room for it within max_bytes; entries
+    larger than max_bytes are not cached at all.
+    """
+
+    def __init__(self, cache_dir=KERNEL_BLOCK_CACHE_DIR, max_bytes=KERNEL_CACHE_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(*parts):
+        """sha1 over arrays (shape, dtype and bytes) and the repr of anything else."""
+        h = hashlib.sha1()
+        for part in parts:
+            if isinstance(part, np.ndarray):
+                _hash_array(h, part)
+            else:
+                h.update(repr(part).encode())
+        return h.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def get(self, key):
+        """The cached array for key, or None."""
+        path = self._path(key)
+        try:
+            array = np.load(path)
+            os.utime(path)
+        except Exception:
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return array
+
+    def put(self, key, array):
+        """Cache array under key; returns False (and writes nothing) if it cannot fit in max_bytes."""
+        array = np.asarray(array)
+        # .npy header included
+        needed = array.nbytes + 128
+        if needed > self.max_bytes:
+            return False
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self._path(key)
+        with self._lock:
+            self._evict(incoming=needed, keep=path)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+        with self._lock:
+            # Another writer may have filled the directory meanwhile
+            self._evict(keep=path)
+        return True
+
+    def _entries(self):
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".npy"):
+                    try:
+                        stat = os.stat(os.path.join(self.cache_dir, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, os.path.join(self.cache_dir, name)))
+        return sorted(entries)
+
+    def _evict(self, incoming=0, keep=None):
+        """Delete least recently used entries until they plus `incoming` bytes fit; `keep` is never deleted."""
+        entries = self._entries()
+        total = sum(size for _, size, path in entries if path != keep) + incoming
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+
+    def configure(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def stats(self):
+        entries = self._entries()
+        return {"hits": self.hits, "misses": self.misses, "entries": len(entries),
+                "bytes": sum(size for _, size, _ in entries)}
+
+    def clear(self):
+        for _, _, path in self._entries():
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+# Shared by the dashboard so reruns on the same selection skip kernel construction
+KERNEL_CACHE = KernelCache()
+KERNEL_TILE_CACHE = KernelCache(KERNEL_TILE_CACHE_DIR, max_bytes=KERNEL_TILE_CACHE_MAX_BYTES)
+
+
+class IncrementalKernel:
+    """Gram matrix of the last selection indexed by TransactionID, grown or sliced for the next one.
+
+    update() keeps every entry between transactions that were already in the
+    previous selection with identical statevectors, and computes only the
+    rows and columns of the others. A transaction whose statevector changed
+    (different preprocessing, bounds or feature map) counts as new. Growing
+    a small-register kernel (dimension below INCREMENTAL_MIN_STATE_DIM) is
+    recomputed instead, since its GEMM is memory-bound.
+    """
+
+    def __init__(self):
+        self.ids = None
+        self.states = None
+        self.kernel = None
+        self.last_stats = {"reused": 0, "computed": 0}
+        self._lock = threading.Lock()
+
+    def _previous_positions(self, ids, states):
+        """Row of each id in the previous kernel, or -1 when it has to be computed."""
+        positions = np.full(len(ids), -1)
+        if self.kernel is None or self.states.shape[1:] != states.shape[1:] or self.states.dtype != states.dtype:
+            return positions
+        index = {tid: k for k, tid in enumerate(self.ids)}
+        candidates = np.array([index.get(tid, -1) for tid in ids], dtype=int)
+        rows = np.flatnonzero(candidates >= 0)
+        for start in range(0, len(rows), DEFAULT_TILE_SIZE):
+            chunk = rows[start:start + DEFAULT_TILE_SIZE]
+            same = np.all(self.states[candidates[chunk]] == states[chunk], axis=1)
+            positions[chunk[same]] = candidates[chunk[same]]
+        return positions
+
+    def update(self, transaction_ids, states, tile_size=DEFAULT_TILE_SIZE, n_jobs=DEFAULT_KERNEL_WORKERS):
+        """Fidelity Gram matrix of states (one row per transaction id), reusing the previous one."""
+        ids = [str(t) for t in transaction_ids]
+        if len(ids) != len(states):
+            raise ValueError(f"Got {len(ids)} transaction ids for {len(states)} statevectors")
+        with self._lock:
+            positions = self._previous_positions(ids, states)
+            reused, new = np.flatnonzero(positions >= 0), np.flatnonzero(positions < 0)
+            if len(new) and states.shape[1] < INCREMENTAL_MIN_STATE_DIM:
+                reused, new = reused[:0], np.arange(len(ids))
+            if len(reused) == 0:
+                K = fidelity_kernel(states, tile_size=tile_size, n_jobs=n_jobs)
+            elif len(new) == 0:
+                # Same or narrower selection: a pure gather (rows, then columns) of the previous matrix
+                K = self.kernel.take(positions, axis=0).take(positions, axis=1)
+            else:
+                K = np.empty((len(ids), len(ids)), dtype=kernel_dtype(states))
+                block = fidelity_kernel(states[new], states[reused], tile_size=tile_size, n_jobs=n_jobs)
+                reused_rows = np.empty((len(reused), len(ids)), dtype=K.dtype)
+                reused_rows[:, reused] = self.kernel.take(positions[reused], axis=0).take(positions[reused], axis=1)
+                reused_rows[:, new] = block.T
+                K[reused] = reused_rows
+                del reused_rows
+                new_rows = np.empty((len(new), len(ids)), dtype=K.dtype)
+                new_rows[:, reused] = block
+                new_rows[:, new] = fidelity_kernel(states[new], tile_size=tile_size, n_jobs=n_jobs)
+                K[new] = new_rows
+            self.ids, self.states, self.kernel = ids, states, K
+            self.last_stats = {"reused": len(reused), "computed": len(new)}
+        return K
+
+    def remember(self, transaction_ids, states, kernel):
+        """Record a Gram matrix obtained elsewhere (e.g. from the kernel cache) as the previous selection."""
+        with self._lock:
+            self.ids, self.states, self.kernel = [str(t) for t in transaction_ids], states, kernel
+
+    def clear(self):
+        with self._lock:
+            self.ids = self.states = self.kernel = None
+
+
+# Shared by the dashboard so widening a filter only computes the newly selected rows
+INCREMENTAL_KERNEL = IncrementalKernel()
+
+
+def states_fingerprint(states, *extra):
+    """Short content hash of a statevector array (plus any extra identifying values)."""
+    h = hashlib.sha1()
+    h.update(str(tuple(extra)).encode())
+    _hash_array(h, states)
+    return h.hexdigest()[:16]
+
+
+def _load_progress(progress_path, fingerprint):
+    if os.path.exists(progress_path):
+        try:
+            with open(progress_path, "r", encoding="utf-8") as f:
+                progress = json.load(f)
+            if progress.get("fingerprint") == fingerprint:
+                return progress
+        except Exception:
+            pass
+    return {"fingerprint": fingerprint, "done_row_tiles": [], "complete": False}
+
+
+def _save_progress(progress_path, progress):
+    tmp_path = progress_path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+    os.replace(tmp_path, progress_path)
+
+
+def _memmap_kernel_files(cache_dir=KERNEL_CACHE_DIR):
+    """[(mtime, bytes, data_path, complete)] of the out-of-core kernels in cache_dir, oldest first."""
+    files = []
+    if os.path.isdir(cache_dir):
+        for name in os.listdir(cache_dir):
+            if name.startswith("kernel_") and name.endswith(".dat"):
+                path = os.path.join(cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                fingerprint = name[len("kernel_"):-len(".dat")]
+                complete = _load_progress(path + ".progress.json", fingerprint)["complete"]
+                files.append((stat.st_mtime, stat.st_size, path, complete))
+    return sorted(files)
+
+
+def _remove_memmap_kernel(data_path):
+    for path in (data_path, data_path + ".progress.json"):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def prune_memmap_kernels(cache_dir=KERNEL_CACHE_DIR, keep=MEMMAP_KERNELS_KEEP, exclude=()):
+    """Delete all but the `keep` most recently used finished out-of-core kernels; returns bytes freed.
+
+    Unfinished files may still be being built (or resumed) and are left alone
+    until they have not been written to for MEMMAP_ABANDONED_SECONDS, as are
+    the paths in `exclude`. Open memmaps of a deleted file stay valid on POSIX.
+    """
+    files = [f for f in _memmap_kernel_files(cache_dir) if f[2] not in exclude]
+    finished = [f for f in files if f[3]]
+    freed = 0
+    abandoned_before = time.time() - MEMMAP_ABANDONED_SECONDS
+    for mtime, size, path, complete in files:
+        if not complete and mtime < abandoned_before:
+            _remove_memmap_kernel(path)
+            freed += size
+    for _, size, path, _ in finished[:max(len(finished) - keep, 0)]:
+        _remove_memmap_kernel(path)
+        freed += size
+    return freed
+
+
+def memmap_kernel_stats(cache_dir=KERNEL_CACHE_DIR):
+    files = _memmap_kernel_files(cache_dir)
+    return {"files": len(files), "bytes": sum(size for _, size, _, _ in files)}
+
+
+def clear_memmap_kernels(cache_dir=KERNEL_CACHE_DIR):
+    for _, _, path, _ in _memmap_kernel_files(cache_dir):
+        _remove_memmap_kernel(path)
+
+
+def memmap_fidelity_kernel(states, cache_dir=KERNEL_CACHE_DIR, tile_size=DEFAULT_TILE_SIZE,
+                           n_jobs=DEFAULT_KERNEL_WORKERS, keep=MEMMAP_KERNELS_KEEP):
+    """Out-of-core symmetric fidelity kernel backed by numpy.memmap.
+
+    Upper-triangle tiles are written one row tile at a time to
+    `<cache_dir>/kernel_<hash>.dat`; a JSON sidecar records finished row tiles
+    so an interrupted build resumes where it stopped. The tiles of a row tile
+    are computed by n_jobs threads. Returns a read-only memmap view of the
+    finished (n, n) matrix (float32 for single-precision statevectors, else float64).
+    Only this kernel and the `keep` - 1 most recently used other finished
+    kernels stay on disk (prune_memmap_kernels).
+    """
+    a = _as_real_if_possible(states)
+    n = len(a)
+    tile_size = _tile_rows(a, tile_size)
+    fingerprint = states_fingerprint(a, tile_size)
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path = os.path.join(cache_dir, f"kernel_{fingerprint}.dat")
+    progress_path = data_path + ".progress.json"
+
+    progress = _load_progress(progress_path, fingerprint)
+    if not (progress["complete"] and os.path.exists(data_path)):
+        if not os.path.exists(data_path):
+            progress = {"fingerprint": fingerprint, "done_row_tiles": [], "complete": False}
+        mode = "r+" if os.path.exists(data_path) else "w+"
+        K = np.memmap(data_path, dtype=kernel_dtype(a), mode=mode, shape=(n, n))
+        done = set(progress["done_row_tiles"])
+
+        for i0 in range(0, n, tile_size):
+            if i0 in done:
+                continue
+            i1 = min(i0 + tile_size, n)
+
+            def compute_tile(i0, j0):
+                j1 = min(j0 + tile_size, n)
+                block = _fidelity_block(a[i0:i1], a[j0:j1])
+                K[i0:i1, j0:j1] = block
+                if j0 != i0:
+                    K[j0:j1, i0:i1] = block.T
+
+            run_tiles(compute_tile, [(i0, j0) for j0 in range(i0, n, tile_size)], n_jobs)
+            K.flush()
+            progress["done_row_tiles"].append(i0)
+            _save_progress(progress_path, progress)
+
+        progress["complete"] = True
+        _save_progress(progress_path, progress)
+        del K
+    else:
+        # Mark as recently used
+        os.utime(data_path)
+
+    prune_memmap_kernels(cache_dir, keep=max(keep - 1, 0), exclude=(data_path,))
+    return np.memmap(data_path, dtype=kernel_dtype(a), mode="r", shape=(n, n))
+
+
+def density_matrix_features(states, batch_size=65536):
+    """Explicit feature map whose inner product equals the fidelity kernel.
+
+    vec(psi psi^H) in a real orthonormal basis of Hermitian matrices: the d
+    diagonal entries plus sqrt(2) * Re / Im of the d(d-1)/2 upper off-diagonal
+    entries, i.e. d**2 = 256 real dimensions for 4 qubits, so that
+    phi(a) . phi(b) = |<a|b>|^2. Real statevectors (the RY/CNOT feature map)
+    have no imaginary part and need only the d(d+1)/2 = 136 symmetric entries.
+    """
+    states = _as_real_if_possible(states)
+    n, d = states.shape
+    if d > 2 ** MAX_DENSITY_QUBITS:
+        raise ValueError(f"Density-matrix features support up to {MAX_DENSITY_QUBITS} qubits, got {int(np.log2(d))}")
+    rows, cols = np.triu_indices(d, k=1)
+    is_complex = np.iscomplexobj(states)
+    n_features = d * d if is_complex else d * (d + 1) // 2
+    feats = np.empty((n, n_features), dtype=kernel_dtype(states))
+    scale = np.sqrt(2.0)
+
+    for start in range(0, n, batch_size):
+        stop = min(start + batch_size, n)
+        s = states[start:stop]
+        out = feats[start:stop]
+        out[:, :d] = np.abs(s) ** 2
+        off = s[:, rows] * s[:, cols].conj() * scale
+        out[:, d:d + len(rows)] = off.real
+        if is_complex:
+            out[:, d + len(rows):] = off.imag
+    return feats
+
+
+def _linear_svc(random_state=42, class_weight="balanced"):
+    # Hinge loss with the same C keeps it close to SVC(kernel='precomputed', C=1)
+    from sklearn.svm import LinearSVC
+
+    return LinearSVC(C=1.0, loss="hinge", dual=True, class_weight=class_weight,
+                     max_iter=20000, random_state=random_state)
+
+
+def linear_qsvm_classifier(random_state=42, class_weight="balanced"):
+    """Linear large-margin model for density_matrix_features, with predict_proba via sigmoid calibration."""
+    from sklearn.calibration import CalibratedClassifierCV
+
+    return CalibratedClassifierCV(_linear_svc(random_state, class_weight), method="sigmoid", cv=3)
+
+
+def linear_qsvm_agreement(states, y, max_samples=400, random_state=42):
+    """Compare the linear QSVM with the precomputed-kernel SVC on a small subset.
+
+    Returns a dict with the subset size, the largest |phi.phi^T - K| entry and
+    the fraction of training predictions on which the two models agree.
+    """
+    from sklearn.svm import SVC
+
+    y = np.asarray(y)
+    rng = np.random.RandomState(random_state)
+    idx = np.arange(len(y))
+    if len(idx) > max_samples:
+        idx = np.sort(rng.choice(idx, size=max_samples, replace=False))
+    sub_states, sub_y = np.asarray(states)[idx], y[idx]
+
+    K = fidelity_kernel(sub_states)
+    feats = density_matrix_features(sub_states)
+    kernel_error = float(np.max(np.abs(feats @ feats.T - K)))
+
+    svc = SVC(kernel="precomputed", class_weight="balanced", random_state=random_state).fit(K, sub_y)
+    lin = _linear_svc(random_state).fit(feats, sub_y)
+    agreement = float(np.mean(svc.predict(K) == lin.predict(feats)))
+    return {"n_samples": int(len(idx)), "kernel_max_error": kernel_error, "prediction_agreement": agreement}
+
+
+def select_landmarks(n, m, labels=None, random_state=42):
+    """Sorted indices of m landmark rows out of n.
+
+    Uniform sampling without replacement, or, when `labels` is given,
+    stratified sampling that keeps the label proportions (at least one
+    landmark per class, so rare fraud rows are always represented).
+    """
+    rng = np.random.RandomState(random_state)
+    m = int(min(max(1, m), n))
+    if labels is None:
+        return np.sort(rng.choice(n, size=m, replace=False))
+
+    labels = np.asarray(labels)
+    classes, counts = np.unique(labels, return_counts=True)
+    alloc = np.minimum(np.maximum(1, np.round(m * counts / n).astype(int)), counts)
+    while alloc.sum() > m and np.any(alloc > 1):
+        alloc[np.argmax(alloc)] -= 1
+    while alloc.sum() < m:
+        alloc[np.argmax(counts - alloc)] += 1
+
+    picked = [rng.choice(np.flatnonzero(labels == c), size=k, replace=False) for c, k in zip(classes, alloc)]
+    return np.sort(np.concatenate(picked))
+
+
+def nystrom_projection(landmark_states, rel_tol=1e-10):
+    """W^(-1/2) of the landmark Gram matrix W, dropping near-null eigen-directions.
+
+    Features K(x, L) @ projection then satisfy phi(a) . phi(b) = K(a, L) W^+ K(L, b).
+    """
+    W = fidelity_kernel(landmark_states)
+    if W.dtype == np.float32:
+        # Single-precision entries carry ~1e-7 noise; 1/sqrt of eigenvalues below that would amplify it
+        rel_tol = max(rel_tol, 100 * np.finfo(np.float32).eps)
+    vals, vecs = np.linalg.eigh(W.astype(np.float64))
+    keep = vals > rel_tol * vals.max()
+    return vecs[:, keep] / np.sqrt(vals[keep])
+
+
+def nystrom_features(states, landmark_states, projection, tile_size=DEFAULT_TILE_SIZE, n_jobs=DEFAULT_KERNEL_WORKERS):
+    """Nystrom features: only the n x m fidelity block K(states, landmarks) is computed."""
+    return fidelity_kernel(states, landmark_states, tile_size=tile_size, n_jobs=n_jobs) @ projection
+
+
+def nystrom_kernel_error(states, features, max_samples=300, random_state=42):
+    """Largest |phi.phi^T - K| entry on a random subset, to report approximation quality."""
+    rng = np.random.RandomState(random_state)
+    idx = np.arange(len(states))
+    if len(idx) > max_samples:
+        idx = rng.choice(idx, size=max_samples, replace=False)
+    approx = features[idx] @ features[idx].T
+    return float(np.max(np.abs(approx - fidelity_kernel(np.asarray(states)[idx]))))
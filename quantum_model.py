@@ -0,0 +1,232 @@
+"""quantum_model.py
+
+Fitted Quantum SVM that can score unseen transactions without being refit.
+The model keeps the training-time min/max normalisation and only the
+statevectors of its support vectors, so new rows are simulated with the same
+scaling and scored through a rectangular fidelity kernel K(new, SV).
+"""
+import time
+
+import numpy as np
+
+import quantum_engine as qengine
+import quantum_kernels as qkernels
+
+# libsvm clips pairwise probabilities to [MIN_PROB, 1 - MIN_PROB]
+MIN_PROB = 1e-7
+
+
+def _sigmoid_predict(decision, prob_a, prob_b):
+    """libsvm's numerically stable Platt sigmoid 1 / (1 + exp(A * f + B))."""
+    f_ab = decision * prob_a + prob_b
+    out = np.empty_like(f_ab)
+    pos = f_ab >= 0
+    out[pos] = np.exp(-f_ab[pos]) / (1.0 + np.exp(-f_ab[pos]))
+    out[~pos] = 1.0 / (1.0 + np.exp(f_ab[~pos]))
+    return out
+
+
+def _binary_coupled_proba(r01, max_iter=100):
+    """Vectorised port of libsvm's multiclass_probability for k=2.
+
+    libsvm solves the pairwise coupling iteratively with a loose tolerance,
+    so this reproduces SVC.predict_proba exactly rather than returning r01.
+    """
+    k = 2
+    eps = 0.005 / k
+    r01 = np.clip(r01, MIN_PROB, 1 - MIN_PROB)
+    r10 = 1.0 - r01
+    n = len(r01)
+    # Q[t][t] = sum_j r[j][t]^2, Q[0][1] = Q[1][0] = -r[1][0] * r[0][1]
+    Q = np.empty((n, k, k))
+    Q[:, 0, 0] = r10 ** 2
+    Q[:, 1, 1] = r01 ** 2
+    Q[:, 0, 1] = Q[:, 1, 0] = -r10 * r01
+    p = np.full((n, k), 1.0 / k)
+    active = np.ones(n, dtype=bool)
+
+    for _ in range(max_iter):
+        Qp = np.einsum('nij,nj->ni', Q, p)
+        pQp = np.sum(p * Qp, axis=1)
+        active &= np.max(np.abs(Qp - pQp[:, None]), axis=1) >= eps
+        if not active.any():
+            break
+        a = active
+        for t in range(k):
+            diff = (-Qp[a, t] + pQp[a]) / Q[a, t, t]
+            p[a, t] += diff
+            pQp[a] = (pQp[a] + diff * (diff * Q[a, t, t] + 2 * Qp[a, t])) / (1 + diff) / (1 + diff)
+            Qp[a] = (Qp[a] + diff[:, None] * Q[a, t, :]) / (1 + diff)[:, None]
+            p[a] /= (1 + diff)[:, None]
+    return p
+
+
+MODES = ("fidelity", "linear", "nystrom")
+
+
+def _balanced_sample_weight(y, sample_weight):
+    """Fold class_weight='balanced' of the expanded (duplicated) data into per-row weights.
+
+    sklearn derives balanced class weights from the unweighted labels, which
+    would be wrong for deduplicated rows standing in for many transactions.
+    """
+    classes, y_idx = np.unique(y, return_inverse=True)
+    totals = np.bincount(y_idx.ravel(), weights=sample_weight)
+    class_weight = totals.sum() / (len(classes) * totals)
+    return np.asarray(sample_weight, dtype=float) * class_weight[y_idx.ravel()]
+
+
+class QuantumKernelSVM:
+    """Quantum SVM on the fidelity kernel with out-of-sample scoring.
+
+    mode="fidelity": precomputed-kernel SVC. After fitting a binary problem
+    only the support-vector statevectors are kept; scoring evaluates K(x, SV)
+    and the SVC decision function directly, which cuts inference memory and
+    latency by n_train / n_sv.
+    mode="linear": linear model on explicit density-matrix features; scoring
+    needs no training statevectors at all.
+    mode="nystrom": linear model on Nystrom features built from n_landmarks
+    landmark rows (uniform or stratified by label), so only the n x m kernel
+    block is ever computed.
+    """
+
+    def __init__(self, n_qubits=4, mode="fidelity", n_landmarks=200, landmark_sampling="uniform",
+                 engine=qengine.DEFAULT_ENGINE, tile_size=qkernels.DEFAULT_TILE_SIZE, random_state=42, reps=1,
+                 n_workers=1, n_jobs=qkernels.DEFAULT_KERNEL_WORKERS, precision=qengine.DEFAULT_PRECISION):
+        if mode not in MODES:
+            raise ValueError(f"Unknown mode '{mode}'. Expected one of {MODES}")
+        self.n_qubits = n_qubits
+        self.reps = reps
+        self.n_workers = n_workers
+        self.n_jobs = n_jobs
+        self.precision = precision
+        self.mode = mode
+        self.n_landmarks = n_landmarks
+        self.landmark_sampling = landmark_sampling
+        self.engine = engine
+        self.tile_size = tile_size
+        self.random_state = random_state
+
+    def fit(self, X, y, quantum_states=None, kernel=None, sample_weight=None):
+        """Fit on X (or on an existing QuantumStates pass over X).
+
+        `kernel` may be a precomputed training Gram matrix for quantum_states,
+        e.g. one built with a different construction method (fidelity mode only).
+        `sample_weight` lets deduplicated rows stand in for all their copies.
+        fit_report_ records the kernel/feature and fitting times.
+        """
+        from sklearn.svm import SVC
+
+        if quantum_states is None:
+            quantum_states = qengine.prepare_quantum_states(X, n_qubits=self.n_qubits, engine=self.engine,
+                                                            reps=self.reps, n_workers=self.n_workers,
+                                                            precision=self.precision)
+        self.bounds_ = quantum_states.bounds
+        self.n_train_ = len(quantum_states)
+        self.support_states_ = None
+        self.fit_report_ = {"mode": self.mode, "n_train": self.n_train_}
+        class_weight = "balanced"
+        if sample_weight is not None:
+            sample_weight = _balanced_sample_weight(y, sample_weight)
+            class_weight = None
+        start = time.time()
+
+        if self.mode == "linear":
+            features = qkernels.density_matrix_features(quantum_states.states)
+        elif self.mode == "nystrom":
+            labels = y if self.landmark_sampling == "stratified" else None
+            idx = qkernels.select_landmarks(self.n_train_, self.n_landmarks, labels=labels,
+                                            random_state=self.random_state)
+            self.landmark_states_ = quantum_states.states[idx]
+            self.projection_ = qkernels.nystrom_projection(self.landmark_states_)
+            features = qkernels.nystrom_features(quantum_states.states, self.landmark_states_, self.projection_,
+                                                 tile_size=self.tile_size, n_jobs=self.n_jobs)
+            self.fit_report_["n_landmarks"] = len(idx)
+            self.fit_report_["rank"] = self.projection_.shape[1]
+            self.fit_report_["kernel_max_error"] = qkernels.nystrom_kernel_error(quantum_states.states, features)
+
+        if self.mode != "fidelity":
+            self.fit_report_["kernel_time"] = time.time() - start
+            start = time.time()
+            self.clf_ = qkernels.linear_qsvm_classifier(random_state=self.random_state, class_weight=class_weight)
+            self.clf_.fit(features, y, sample_weight=sample_weight)
+            self.fit_report_["fit_time"] = time.time() - start
+            return self
+
+        if kernel is None:
+            kernel = qkernels.fidelity_kernel(quantum_states.states, tile_size=self.tile_size, n_jobs=self.n_jobs)
+        self.clf_ = SVC(kernel='precomputed', probability=True, class_weight=class_weight,
+                        random_state=self.random_state)
+        self.fit_report_["kernel_time"] = time.time() - start
+        start = time.time()
+        self.clf_.fit(kernel, y, sample_weight=sample_weight)
+        self.fit_report_["fit_time"] = time.time() - start
+        if len(self.clf_.classes_) == 2:
+            self.support_states_ = quantum_states.states[self.clf_.support_]
+        else:
+            # Multi-class decision values need libsvm's one-vs-one bookkeeping; keep all rows
+            self.support_states_ = quantum_states.states
+        return self
+
+    @property
+    def n_support_vectors_(self):
+        return len(self.support_states_) if self.mode == "fidelity" else 0
+
+    @property
+    def support_only_(self):
+        return self.mode == "fidelity" and len(self.clf_.classes_) == 2
+
+    @property
+    def classes_(self):
+        return self.clf_.classes_
+
+    def transform_states(self, X):
+        """Simulate new rows using the training-time normalisation bounds."""
+        return qengine.prepare_quantum_states(X, n_qubits=self.n_qubits, bounds=self.bounds_,
+                                              engine=self.engine, reps=self.reps, n_workers=self.n_workers,
+                                              precision=self.precision)
+
+    def cross_kernel(self, X=None, quantum_states=None):
+        """Rectangular fidelity kernel K(X, SV) of shape (n_new, n_support_vectors)."""
+        if quantum_states is None:
+            quantum_states = self.transform_states(X)
+        return qkernels.fidelity_kernel(quantum_states.states, self.support_states_, tile_size=self.tile_size,
+                                        n_jobs=self.n_jobs)
+
+    def _scoring_input(self, X, quantum_states):
+        if quantum_states is None:
+            quantum_states = self.transform_states(X)
+        if self.mode == "linear":
+            return qkernels.density_matrix_features(quantum_states.states)
+        if self.mode == "nystrom":
+            return qkernels.nystrom_features(quantum_states.states, self.landmark_states_, self.projection_,
+                                             tile_size=self.tile_size, n_jobs=self.n_jobs)
+        return self.cross_kernel(quantum_states=quantum_states)
+
+    def _support_decision(self, kernel_sv):
+        return kernel_sv @ self.clf_.dual_coef_[0] + self.clf_.intercept_[0]
+
+    def _support_proba(self, decision):
+        # libsvm's binary decision value has the opposite sign of sklearn's
+        r01 = _sigmoid_predict(-decision, self.clf_.probA_[0], self.clf_.probB_[0])
+        return _binary_coupled_proba(r01)
+
+    def decision_function(self, X=None, quantum_states=None):
+        scoring_input = self._scoring_input(X, quantum_states)
+        if self.support_only_:
+            return self._support_decision(scoring_input)
+        return self.clf_.decision_function(scoring_input)
+
+    def predict(self, X=None, quantum_states=None):
+        return self.predict_with_proba(X, quantum_states)[0]
+
+    def predict_proba(self, X=None, quantum_states=None):
+        return self.predict_with_proba(X, quantum_states)[1]
+
+    def predict_with_proba(self, X=None, quantum_states=None):
+        """(predictions, probabilities) from a single kernel / feature evaluation."""
+        scoring_input = self._scoring_input(X, quantum_states)
+        if self.support_only_:
+            decision = self._support_decision(scoring_input)
+            return self.clf_.classes_[(decision > 0).astype(int)], self._support_proba(decision)
+        return self.clf_.predict(scoring_input), self.clf_.predict_proba(scoring_input)
@@ -0,0 +1,146 @@
+"""quantum_sampling.py
+
+Shot-based estimators for the quantum feature map. Every circuit of a call is
+bound from one transpiled template and submitted to a single process-wide
+AerSimulator as one batched job. Pauli-Z expectations come from the measured
+counts. Fidelity kernel entries are the all-zeros frequency of the
+compute-uncompute circuit U(x_j)^dagger U(x_i). Without qiskit-aer the same
+finite-shot statistics are drawn from the exact statevectors with numpy, so
+the accuracy cost of finite shots can still be measured.
+"""
+import threading
+from functools import lru_cache
+
+import numpy as np
+
+import quantum_engine as qengine
+
+try:
+    from qiskit_aer import AerSimulator
+except Exception:
+    try:
+        from qiskit.providers.aer import AerSimulator  # type: ignore
+    except Exception:
+        AerSimulator = None
+
+AER_OK = AerSimulator is not None
+
+DEFAULT_SHOTS = 1024
+
+# Larger batches are split into several jobs so bound circuits do not pile up in memory
+MAX_CIRCUITS_PER_JOB = 4096
+
+_SIMULATOR = None
+_SIMULATOR_LOCK = threading.Lock()
+
+
+def get_simulator():
+    """The shared AerSimulator, created on first use (None without qiskit-aer)."""
+    global _SIMULATOR
+    if not AER_OK:
+        return None
+    with _SIMULATOR_LOCK:
+        if _SIMULATOR is None:
+            _SIMULATOR = AerSimulator()
+        return _SIMULATOR
+
+
+def backend_name():
+    return "aer" if AER_OK else "statevector-sampling"
+
+
+@lru_cache(maxsize=16)
+def measured_template(n_qubits, reps=1):
+    """Feature-map template with final measurements, transpiled once for the shared simulator."""
+    from qiskit import transpile
+
+    qc = qengine.feature_map_template(n_qubits, reps).copy()
+    qc.measure_all()
+    return transpile(qc, get_simulator())
+
+
+@lru_cache(maxsize=16)
+def kernel_template(n_qubits, reps=1):
+    """(transpiled U(x)U(y)^dagger circuit with measurements, x vector, y vector) for kernel estimation."""
+    from qiskit import transpile
+    from qiskit.circuit import ParameterVector
+
+    feature_map = qengine.feature_map_template(n_qubits, reps)
+    x = ParameterVector("x", n_qubits)
+    y = ParameterVector("y", n_qubits)
+    qc = feature_map.assign_parameters(dict(zip(feature_map.parameters, x)))
+    qc.compose(feature_map.assign_parameters(dict(zip(feature_map.parameters, y))).inverse(), inplace=True)
+    qc.measure_all()
+    return transpile(qc, get_simulator()), x, y
+
+
+def _run_batched(bind, n_circuits, shots, seed=None):
+    """Counts dicts of bind(k) for k in range(n_circuits), MAX_CIRCUITS_PER_JOB circuits per Aer job."""
+    sim = get_simulator()
+    counts = []
+    for start in range(0, n_circuits, MAX_CIRCUITS_PER_JOB):
+        batch = [bind(k) for k in range(start, min(start + MAX_CIRCUITS_PER_JOB, n_circuits))]
+        result = sim.run(batch, shots=shots, seed_simulator=seed).result()
+        counts.extend(result.get_counts(k) for k in range(len(batch)))
+    return counts
+
+
+def _outcomes(counts):
+    """(basis indices, frequencies) of one counts dict; bitstrings are little-endian like the statevectors."""
+    keys = list(counts)
+    idx = np.array([int(key.replace(" ", ""), 2) for key in keys], dtype=np.int64)
+    freq = np.array([counts[key] for key in keys], dtype=float)
+    return idx, freq / freq.sum()
+
+
+def estimate_expectations(angles, shots=DEFAULT_SHOTS, correlators=False, reps=1, seed=None):
+    """Finite-shot estimate of pauli_z_expectations for every row of padded angles."""
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    n, n_qubits = angles.shape
+    if AER_OK:
+        template = measured_template(n_qubits, reps)
+        counts = _run_batched(lambda k: template.assign_parameters(angles[k]), n, shots, seed)
+        out = None
+        for k, row_counts in enumerate(counts):
+            idx, freq = _outcomes(row_counts)
+            row = freq @ qengine.z_sign_masks(n_qubits, correlators, basis=idx)
+            if out is None:
+                out = np.empty((n, len(row)))
+            out[k] = row
+        return out
+
+    rng = np.random.RandomState(seed)
+    states = qengine.simulate_statevectors(angles, reps=reps)
+    probs = np.clip(qengine._probabilities(states), 0, None)
+    masks = qengine.z_sign_masks(n_qubits, correlators)
+    out = np.empty((n, masks.shape[1]))
+    for k in range(n):
+        out[k] = rng.multinomial(shots, probs[k] / probs[k].sum()) @ masks / shots
+    return out
+
+
+def estimate_fidelity_kernel(angles, shots=DEFAULT_SHOTS, reps=1, seed=None):
+    """Finite-shot estimate of the symmetric fidelity Gram matrix of padded angles.
+
+    The n(n-1)/2 off-diagonal pairs are run as compute-uncompute circuits in
+    one batched job; the diagonal is exactly 1 on an ideal simulator.
+    """
+    angles = np.atleast_2d(np.asarray(angles, dtype=float))
+    n, n_qubits = angles.shape
+    rows, cols = np.triu_indices(n, k=1)
+    K = np.eye(n)
+    if AER_OK:
+        template, x, y = kernel_template(n_qubits, reps)
+        zeros = "0" * n_qubits
+        counts = _run_batched(lambda k: template.assign_parameters({x: angles[rows[k]], y: angles[cols[k]]}),
+                              len(rows), shots, seed)
+        values = np.array([c.get(zeros, 0) for c in counts], dtype=float) / shots
+    else:
+        import quantum_kernels as qkernels
+
+        rng = np.random.RandomState(seed)
+        exact = qkernels.fidelity_kernel(qengine.simulate_statevectors(angles, reps=reps))
+        values = rng.binomial(shots, np.clip(exact[rows, cols], 0.0, 1.0)) / shots
+    K[rows, cols] = values
+    K[cols, rows] = values
+    return K
@@ -0,0 +1,262 @@
+"""quantum_store.py
+
+Persistent per-transaction quantum embedding store. Statevectors and Pauli-Z
+expectation features are kept in a SQLite file under static/uploads, keyed by
+TransactionID and a hash of the feature-map definition plus the
+normalisation bounds, so re-uploading the same CSV only simulates the
+transactions that have not been seen before.
+"""
+import os
+import time
+import json
+import sqlite3
+import hashlib
+import threading
+from contextlib import closing
+
+import numpy as np
+
+import quantum_engine as qengine
+
+EMBEDDING_STORE_PATH = os.path.join(os.path.dirname(__file__), "static", "uploads", "embedding_store.sqlite")
+
+# Once the file holds more than this, the oldest feature-map contexts are dropped
+EMBEDDING_STORE_MAX_BYTES = 1024 * 1024 * 1024
+
+# Stored angles must agree with the recomputed ones to this many radians
+ANGLE_TOLERANCE = 1e-9
+
+# SQLite's default limit on bound parameters per statement is 999
+_QUERY_CHUNK = 900
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS contexts (
+    context TEXT PRIMARY KEY,
+    n_qubits INTEGER NOT NULL,
+    dtype TEXT NOT NULL,
+    definition TEXT NOT NULL,
+    created REAL NOT NULL,
+    last_used REAL
+);
+CREATE TABLE IF NOT EXISTS embeddings (
+    context TEXT NOT NULL,
+    transaction_id TEXT NOT NULL,
+    angles BLOB NOT NULL,
+    statevector BLOB NOT NULL,
+    expectations BLOB NOT NULL,
+    PRIMARY KEY (context, transaction_id)
+) WITHOUT ROWID;
+"""
+
+
+def feature_map_context(n_qubits, bounds, dtype=np.complex128, reps=1):
+    """(hash, definition) identifying the feature map, its gate list and normalisation bounds."""
+    X_min, X_range = bounds
+    definition = json.dumps({
+        "n_qubits": int(n_qubits),
+        "ops": [list(op) for op in qengine.feature_map_ops(n_qubits, reps)],
+        "dtype": np.dtype(dtype).str,
+        "x_min": np.asarray(X_min, dtype=float).tolist(),
+        "x_range": np.asarray(X_range, dtype=float).tolist(),
+    }, sort_keys=True)
+    return hashlib.sha1(definition.encode()).hexdigest()[:16], definition
+
+
+class EmbeddingStore:
+    """SQLite-backed statevector / Pauli-Z embedding store keyed by TransactionID.
+
+    Every distinct set of normalisation bounds is its own context with a full
+    copy of the embeddings, so once the file exceeds max_bytes whole contexts
+    are dropped, least recently used first (see prune).
+    """
+
+    def __init__(self, path=EMBEDDING_STORE_PATH, max_bytes=EMBEDDING_STORE_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.last_stats = {"loaded": 0, "simulated": 0, "stale": 0}
+        self.pruned_contexts = 0
+        self.pruned_bytes = 0
+        # (file mtime, size) -> row counts, so stats() skips the COUNT(*) scans while the file is unchanged
+        self._counts = (None, None)
+
+    def _connect(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.executescript(_SCHEMA)
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(contexts)")]
+        if "last_used" not in columns:
+            # Stores written before contexts were pruned by recency
+            with conn:
+                conn.execute("ALTER TABLE contexts ADD COLUMN last_used REAL")
+                conn.execute("UPDATE contexts SET last_used = created")
+        return conn
+
+    @staticmethod
+    def _touch(conn, context):
+        with conn:
+            conn.execute("UPDATE contexts SET last_used = ? WHERE context = ?", (time.time(), context))
+
+    def load(self, context, transaction_ids):
+        """{transaction_id: (angles, statevector, expectations)} for the ids stored under context."""
+        ids = list(dict.fromkeys(str(t) for t in transaction_ids))
+        rows = {}
+        with closing(self._connect()) as conn:
+            for start in range(0, len(ids), _QUERY_CHUNK):
+                chunk = ids[start:start + _QUERY_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                cursor = conn.execute(
+                    f"SELECT transaction_id, angles, statevector, expectations FROM embeddings "
+                    f"WHERE context = ? AND transaction_id IN ({placeholders})", [context] + chunk)
+                for tid, angles, state, expvals in cursor:
+                    rows[tid] = (angles, state, expvals)
+            if rows:
+                self._touch(conn, context)
+        return rows
+
+    def save(self, context, definition, n_qubits, transaction_ids, angles, states, expectations):
+        """Insert (or replace) one row per transaction in a single transaction."""
+        states = np.ascontiguousarray(states)
+        records = [(context, str(tid), np.ascontiguousarray(a).tobytes(), s.tobytes(),
+                    np.ascontiguousarray(e).tobytes())
+                   for tid, a, s, e in zip(transaction_ids, angles, states, expectations)]
+        with self._lock, closing(self._connect()) as conn, conn:
+            now = time.time()
+            conn.execute("INSERT OR IGNORE INTO contexts (context, n_qubits, dtype, definition, created, last_used) "
+                         "VALUES (?, ?, ?, ?, ?, ?)", (context, int(n_qubits), states.dtype.str, definition, now, now))
+            conn.execute("UPDATE contexts SET last_used = ? WHERE context = ?", (now, context))
+            conn.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?, ?)", records)
+        self.prune(keep=context)
+
+    @staticmethod
+    def _used_bytes(conn):
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        pages = conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        return page_size * (pages - free_pages)
+
+    def prune(self, keep=None):
+        """Drop the least recently used contexts (by contexts.last_used) until the store fits in max_bytes.
+
+        The context `keep` (the one just written) is never dropped. The file is
+        vacuumed afterwards so the freed space goes back to the disk. Returns
+        the number of contexts dropped.
+        """
+        if not os.path.exists(self.path):
+            return 0
+        dropped = 0
+        with self._lock, closing(self._connect()) as conn:
+            size_before = os.path.getsize(self.path)
+            if self._used_bytes(conn) <= self.max_bytes:
+                return 0
+            contexts = [row[0] for row in conn.execute("SELECT context FROM contexts ORDER BY last_used")]
+            for context in contexts:
+                if context == keep:
+                    continue
+                with conn:
+                    conn.execute("DELETE FROM embeddings WHERE context = ?", (context,))
+                    conn.execute("DELETE FROM contexts WHERE context = ?", (context,))
+                dropped += 1
+                if self._used_bytes(conn) <= self.max_bytes:
+                    break
+            if dropped:
+                conn.execute("VACUUM")
+        if dropped:
+            self.pruned_contexts += dropped
+            self.pruned_bytes += max(size_before - os.path.getsize(self.path), 0)
+            print(f" Embedding store: dropped {dropped} least recently used feature-map context(s) to stay under "
+                  f"{self.max_bytes / 1e6:.0f} MB")
+        return dropped
+
+    def configure(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.prune()
+
+    def prepare_quantum_states(self, X, transaction_ids, n_qubits=4, bounds=None,
+                               engine=qengine.DEFAULT_ENGINE, cache=None, reps=1, n_workers=1,
+                               precision=qengine.DEFAULT_PRECISION):
+        """qengine.prepare_quantum_states that bulk-loads previously seen transactions.
+
+        Only rows whose TransactionID is missing from the store (or whose stored
+        angles no longer match, e.g. the ID was reused) are simulated; those are
+        written back. last_stats records how many rows were loaded vs simulated.
+        Registers too large for the dense simulation path bypass the store.
+        n_workers shards the simulation of wide registers (PARALLEL_MIN_QUBITS
+        or more) over a process pool, as in qengine.prepare_quantum_states.
+        """
+        X_norm, bounds = qengine.normalize_features(X, bounds)
+        angles = qengine.pad_to_qubits(X_norm, n_qubits)
+        transaction_ids = [str(t) for t in transaction_ids]
+        if len(transaction_ids) != len(angles):
+            raise ValueError(f"Got {len(transaction_ids)} transaction ids for {len(angles)} rows")
+        dtype = qengine.state_dtype(precision)
+        plan = qengine.plan_simulation(len(angles), n_qubits, dtype=dtype)
+        if plan["path"] != "dense":
+            self.last_stats = {"loaded": 0, "simulated": len(angles), "stale": 0}
+            return qengine.prepare_quantum_states(X, n_qubits=n_qubits, bounds=bounds, engine=engine, reps=reps,
+                                                  n_workers=n_workers, precision=precision)
+        context, definition = feature_map_context(n_qubits, bounds, dtype, reps)
+
+        real_dtype = np.finfo(dtype).dtype
+        states = np.empty((len(angles), 2 ** n_qubits), dtype=dtype)
+        expectations = np.empty((len(angles), n_qubits), dtype=real_dtype)
+        stored = self.load(context, transaction_ids)
+        missing, stale = [], 0
+        for k, tid in enumerate(transaction_ids):
+            row = stored.get(tid)
+            if row is not None:
+                row_angles = np.frombuffer(row[0], dtype=float)
+                same_angles = row_angles.shape == angles[k].shape and \
+                    np.all(np.abs(row_angles - angles[k]) <= ANGLE_TOLERANCE)
+                if same_angles:
+                    states[k] = np.frombuffer(row[1], dtype=dtype)
+                    expectations[k] = np.frombuffer(row[2], dtype=real_dtype)
+                    continue
+                stale += 1
+            missing.append(k)
+
+        parallel = n_workers > 1 and engine == "numpy" and n_qubits >= qengine.PARALLEL_MIN_QUBITS
+        if missing:
+            if parallel:
+                states[missing] = qengine.simulate_parallel(angles[missing], n_workers=n_workers, reps=reps,
+                                                            batch_size=max(1, plan["batch_size"] // n_workers),
+                                                            dtype=dtype)
+            elif cache is not None:
+                states[missing] = cache.simulate(angles[missing], engine=engine, dtype=dtype, reps=reps)
+            else:
+                states[missing] = qengine.simulate_statevectors(angles[missing], engine=engine, dtype=dtype,
+                                                                reps=reps)
+            expectations[missing] = qengine.pauli_z_expectations(states[missing])
+            self.save(context, definition, n_qubits, [transaction_ids[k] for k in missing], angles[missing],
+                      states[missing], expectations[missing])
+
+        self.last_stats = {"loaded": len(angles) - len(missing), "simulated": len(missing), "stale": stale}
+        if parallel and missing:
+            plan = dict(plan, path=plan["path"] + " (parallel)", n_workers=n_workers)
+        return qengine.QuantumStates(angles, states, bounds, n_qubits, expectations={False: expectations}, reps=reps,
+                                     plan=plan)
+
+    def stats(self):
+        """Stored transaction / context counts, the file size in bytes and what prune has dropped so far."""
+        if not os.path.exists(self.path):
+            return {"transactions": 0, "contexts": 0, "bytes": 0, "pruned_contexts": self.pruned_contexts,
+                    "pruned_bytes": self.pruned_bytes}
+        stat = os.stat(self.path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        if self._counts[0] != version:
+            with closing(self._connect()) as conn:
+                n_rows = conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+                n_contexts = conn.execute("SELECT COUNT(*) FROM contexts").fetchone()[0]
+            self._counts = (version, (n_rows, n_contexts))
+        n_rows, n_contexts = self._counts[1]
+        return {"transactions": n_rows, "contexts": n_contexts, "bytes": stat.st_size,
+                "pruned_contexts": self.pruned_contexts, "pruned_bytes": self.pruned_bytes}
+
+    def clear(self):
+        with self._lock, closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM embeddings")
+            conn.execute("DELETE FROM contexts")
+
+
+# Default store shared by the dashboard
+EMBEDDING_STORE = EmbeddingStore()
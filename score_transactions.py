@@ -0,0 +1,92 @@
+"""score_transactions.py
+
+Headless batch scorer for large transaction files. Loads a model artifact
+saved from the dashboard (model_artifacts.py), reads the CSV in fixed-size
+chunks with the dashboard's load_dataset schema and appends predictions and
+fraud probabilities to the output CSV one chunk at a time, so memory stays
+flat for multi-GB nightly files. Streamlit and Plotly are never imported.
+
+    python score_transactions.py fraud-pipeline transactions.csv scores.csv --model quantum
+"""
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+import model_artifacts as martifacts
+from transactions import DEFAULT_CHUNK_SIZE, FEATURE_COLUMNS, ID_COLUMN, iter_dataset
+
+
+def resolve_model_path(model):
+    """An artifact directory, or the name of one saved under model_artifacts.MODEL_DIR."""
+    if os.path.isdir(model):
+        return model
+    return os.path.join(martifacts.MODEL_DIR, model)
+
+
+def score_csv(pipeline, input_path, output_path, model=None, chunk_size=DEFAULT_CHUNK_SIZE, keep_columns=False,
+              log=print):
+    """Score input_path chunk by chunk into output_path; returns row count, time and rows/s.
+
+    The output holds TransactionID (or every input column with keep_columns),
+    Predicted_Label and Fraud_Probability. It is written to a .partial file
+    and renamed once complete, so an interrupted run never leaves a
+    truncated output behind.
+    """
+    partial_path = output_path + ".partial"
+    start = time.time()
+    rows = fraud = 0
+    with open(partial_path, "w", newline="", encoding="utf-8") as out:
+        for k, chunk in enumerate(iter_dataset(input_path, chunk_size=chunk_size)):
+            pred, proba = pipeline.score(chunk[FEATURE_COLUMNS], model=model)
+            result = chunk if keep_columns else chunk[[ID_COLUMN]].copy()
+            result["Predicted_Label"] = pred
+            result["Fraud_Probability"] = proba[:, 1]
+            result.to_csv(out, header=k == 0, index=False)
+            rows += len(chunk)
+            fraud += int(np.sum(np.asarray(pred) == 1))
+            elapsed = time.time() - start
+            if log is not None:
+                log(f" {rows:,} rows scored in {elapsed:.1f}s ({rows / max(elapsed, 1e-9):,.0f} rows/s)")
+    os.replace(partial_path, output_path)
+    elapsed = time.time() - start
+    return {"rows": rows, "fraud_detected": fraud, "seconds": elapsed,
+            "rows_per_s": rows / elapsed if elapsed > 0 else None}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a transaction CSV with a saved fraud-detection model.")
+    parser.add_argument("model", help=f"model artifact directory, or the name of one under {martifacts.MODEL_DIR}")
+    parser.add_argument("input", help="transaction CSV (same columns as the training data; Label is optional)")
+    parser.add_argument("output", help="CSV to write predictions and fraud probabilities to")
+    parser.add_argument("--model", dest="which", choices=("quantum", "classical"),
+                        help="which fitted model to score with (default: quantum if the artifact has one)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="rows read and scored at a time")
+    parser.add_argument("--keep-columns", action="store_true", help="copy every input column to the output")
+    parser.add_argument("--kernel-threads", type=int, default=None,
+                        help="threads for the quantum kernel tiles (default: as saved)")
+    args = parser.parse_args(argv)
+
+    log = lambda message: print(message, file=sys.stderr)
+    try:
+        load_start = time.time()
+        pipeline = martifacts.load_pipeline(resolve_model_path(args.model))
+        log(f" Loaded {', '.join(pipeline.models)} model in {(time.time() - load_start) * 1000:.1f} ms")
+        if args.which and args.which not in pipeline.models:
+            raise ValueError(f"The artifact has no {args.which} model (available: {pipeline.models})")
+        if args.kernel_threads and pipeline.quantum is not None:
+            pipeline.quantum.n_jobs = args.kernel_threads
+        summary = score_csv(pipeline, args.input, args.output, model=args.which, chunk_size=args.chunk_size,
+                            keep_columns=args.keep_columns, log=log)
+    except Exception as e:
+        log(f" Scoring failed: {e}")
+        return 1
+    log(f" Scored {summary['rows']:,} transactions ({summary['fraud_detected']:,} flagged) in "
+        f"{summary['seconds']:.1f}s: {summary['rows_per_s'] or 0:,.0f} rows/s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
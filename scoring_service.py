@@ -0,0 +1,306 @@
+"""scoring_service.py
+
+Local HTTP service that scores single transactions (or small lists) in real
+time with a saved model artifact (model_artifacts.py). Requests arriving
+within a short latency window are coalesced into one micro-batch per model,
+so the vectorised simulation and K(x, SV) kernel paths see hundreds of rows
+instead of one. Only the standard library HTTP server is used.
+
+    python scoring_service.py fraud-pipeline --port 8765 --window-ms 5
+    curl -X POST localhost:8765/score?model=quantum -d '{"TransactionID": "T1", "Amount": 950.0,
+         "CountryRisk": 2, "TimeOfDay": "Night", "SenderBlacklisted": 0, "SenderAgeDays": 40}'
+    curl localhost:8765/metrics
+
+POST /score takes one transaction object or a list of them and returns the
+TransactionID, Predicted_Label and Fraud_Probability of each. GET /metrics
+reports request counts, p50/p99 latencies and the micro-batch sizes per model.
+"""
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+
+import model_artifacts as martifacts
+from score_transactions import resolve_model_path
+from transactions import FEATURE_COLUMNS, ID_COLUMN, prepare_transactions
+
+DEFAULT_PORT = 8765
+
+# Time the first request of a batch waits for others to join it
+DEFAULT_WINDOW_MS = 5.0
+DEFAULT_MAX_BATCH = 512
+
+# Latencies kept for the percentile counters
+LATENCY_WINDOW = 10000
+
+# Seconds a request waits for its batch before giving up
+REQUEST_TIMEOUT = 60
+
+
+class LatencyStats:
+    """Thread-safe rolling request latencies and batch sizes."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self._batch_sizes = deque(maxlen=window)
+        self.requests = 0
+        self.rows = 0
+        self.errors = 0
+
+    def record(self, seconds, rows, error=False):
+        with self._lock:
+            self._latencies.append(seconds)
+            self.requests += 1
+            self.rows += rows
+            self.errors += int(error)
+
+    def record_batch(self, rows):
+        with self._lock:
+            self._batch_sizes.append(rows)
+
+    def snapshot(self):
+        """Counts plus p50/p99/max latency (ms) and mean/max batch rows over the rolling window."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_sizes = np.array(self._batch_sizes)
+            stats = {"requests": self.requests, "rows": self.rows, "errors": self.errors,
+                     "batches": len(batch_sizes)}
+        if len(latencies):
+            p50, p99 = np.percentile(latencies, [50, 99])
+            stats.update({"p50_ms": float(p50), "p99_ms": float(p99), "max_ms": float(latencies.max())})
+        if len(batch_sizes):
+            stats.update({"mean_batch_rows": float(batch_sizes.mean()), "max_batch_rows": int(batch_sizes.max())})
+        return stats
+
+
+class MicroBatcher:
+    """Coalesces concurrent scoring requests for one model into micro-batches.
+
+    A worker thread takes the first queued request, keeps collecting until
+    window_ms has passed or max_batch rows are queued, scores everything with
+    a single pipeline.score call and hands each request its slice of the
+    result through a Future. If the batch fails, each request is rescored on
+    its own so only the bad one gets the error.
+    """
+
+    def __init__(self, pipeline, model, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH, stats=None):
+        self.pipeline = pipeline
+        self.model = model
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.stats = stats or LatencyStats()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=f"micro-batcher-{model}", daemon=True)
+        self._thread.start()
+
+    def submit(self, features):
+        """Future resolving to (predictions, probabilities) for the rows of the features frame."""
+        future = Future()
+        self._queue.put((features, future))
+        return future
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+    def _collect(self, first):
+        batch, rows = [first], len(first[0])
+        deadline = time.monotonic() + self.window
+        while rows < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # Score what is queued, then stop
+                self._queue.put(None)
+                break
+            batch.append(item)
+            rows += len(item[0])
+        return batch, rows
+
+    def _run(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, rows = self._collect(first)
+            try:
+                features = pd.concat([item[0] for item in batch], ignore_index=True)
+                pred, proba = self.pipeline.score(features, model=self.model)
+            except Exception as e:
+                if len(batch) == 1:
+                    first[1].set_exception(e)
+                else:
+                    self._score_separately(batch)
+                continue
+            self.stats.record_batch(rows)
+            start = 0
+            for item_features, future in batch:
+                end = start + len(item_features)
+                future.set_result((pred[start:end], proba[start:end]))
+                start = end
+
+    def _score_separately(self, batch):
+        for item_features, future in batch:
+            try:
+                future.set_result(self.pipeline.score(item_features, model=self.model))
+                self.stats.record_batch(len(item_features))
+            except Exception as e:
+                future.set_exception(e)
+
+
+def validate_features(df):
+    """FEATURE_COLUMNS of df as floats; raises ValueError naming the columns with missing or non-numeric values.
+
+    Checked per request so one malformed transaction cannot fail the
+    micro-batch it would have joined.
+    """
+    features = df[FEATURE_COLUMNS].apply(pd.to_numeric, errors="coerce").astype(float)
+    bad = ~np.isfinite(features.to_numpy())
+    if bad.any():
+        columns = [c for c, is_bad in zip(FEATURE_COLUMNS, bad.any(axis=0)) if is_bad]
+        raise ValueError(f"Missing or non-numeric values in {columns} "
+                         f"({int(bad.any(axis=1).sum())} of {len(features)} transactions)")
+    return features
+
+
+class ScoringService:
+    """One MicroBatcher and LatencyStats per model of a loaded FraudPipeline."""
+
+    def __init__(self, pipeline, window_ms=DEFAULT_WINDOW_MS, max_batch=DEFAULT_MAX_BATCH):
+        self.pipeline = pipeline
+        self.window_ms = window_ms
+        self.max_batch = max_batch
+        self.started = time.time()
+        self.stats = {model: LatencyStats() for model in pipeline.models}
+        self.batchers = {model: MicroBatcher(pipeline, model, window_ms, max_batch, self.stats[model])
+                         for model in pipeline.models}
+
+    def score(self, records, model=None):
+        """[{TransactionID, Predicted_Label, Fraud_Probability}] for a list of transaction dicts."""
+        model = model or self.pipeline.models[0]
+        if model not in self.batchers:
+            raise ValueError(f"Unknown model '{model}'. Expected one of {self.pipeline.models}")
+        df = prepare_transactions(pd.DataFrame.from_records(records), require_label=False)
+        pred, proba = self.batchers[model].submit(validate_features(df)).result(timeout=REQUEST_TIMEOUT)
+        return [{ID_COLUMN: tid, "Predicted_Label": int(p), "Fraud_Probability": float(pr)}
+                for tid, p, pr in zip(df[ID_COLUMN].tolist(), pred, proba[:, 1])]
+
+    def metrics(self):
+        return {"uptime_s": time.time() - self.started, "window_ms": self.window_ms, "max_batch": self.max_batch,
+                "models": {model: stats.snapshot() for model, stats in self.stats.items()}}
+
+    def close(self):
+        for batcher in self.batchers.values():
+            batcher.close()
+
+
+class ScoringRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        service = self.server.service
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok", "models": service.pipeline.models})
+        elif path == "/metrics":
+            self._send_json(200, service.metrics())
+        else:
+            self._send_json(404, {"error": f"Unknown path {path}"})
+
+    def do_POST(self):
+        start = time.perf_counter()
+        service = self.server.service
+        url = urlparse(self.path)
+        if url.path != "/score":
+            self._send_json(404, {"error": f"Unknown path {url.path}"})
+            return
+        model = parse_qs(url.query).get("model", [None])[0] or service.pipeline.models[0]
+        rows = 0
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+            single = isinstance(payload, dict)
+            records = [payload] if single else payload
+            if not isinstance(records, list) or not records:
+                raise ValueError("Expected a transaction object or a non-empty list of them")
+            rows = len(records)
+            results = service.score(records, model=model)
+        except Exception as e:
+            if model in service.stats:
+                service.stats[model].record(time.perf_counter() - start, rows, error=True)
+            self._send_json(400, {"error": str(e)})
+            return
+        self._send_json(200, results[0] if single else results)
+        service.stats[model].record(time.perf_counter() - start, rows)
+
+    def log_message(self, format, *args):
+        # One stderr line per request would dominate the latency being measured
+        pass
+
+
+class ScoringHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # The socketserver default backlog of 5 resets connections under bursts of concurrent clients
+    request_queue_size = 256
+
+
+def make_server(pipeline, host="127.0.0.1", port=DEFAULT_PORT, window_ms=DEFAULT_WINDOW_MS,
+                max_batch=DEFAULT_MAX_BATCH):
+    """ThreadingHTTPServer bound to host:port (port 0 picks a free one) with .service attached."""
+    server = ScoringHTTPServer((host, port), ScoringRequestHandler)
+    server.service = ScoringService(pipeline, window_ms=window_ms, max_batch=max_batch)
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve a saved fraud-detection model over local HTTP.")
+    parser.add_argument("model", help=f"model artifact directory, or the name of one under {martifacts.MODEL_DIR}")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--window-ms", type=float, default=DEFAULT_WINDOW_MS,
+                        help="how long a request waits for others to join its micro-batch "
+                             "(0: only batch requests already queued)")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH, help="rows per micro-batch")
+    args = parser.parse_args(argv)
+
+    try:
+        pipeline = martifacts.load_pipeline(resolve_model_path(args.model))
+        server = make_server(pipeline, args.host, args.port, args.window_ms, args.max_batch)
+    except Exception as e:
+        print(f" Could not start the scoring service: {e}", file=sys.stderr)
+        return 1
+    host, port = server.server_address[:2]
+    print(f" Serving {', '.join(pipeline.models)} model on http://{host}:{port} "
+          f"(window {args.window_ms:g} ms, max batch {args.max_batch})", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.service.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""transactions.py
+
+Transaction CSV schema shared by the Streamlit dashboard and the headless
+scoring tools (no Streamlit or Plotly imports here). Files can be read whole
+or streamed in fixed-size chunks with the same validation and encoding.
+"""
+import pandas as pd
+
+ID_COLUMN = "TransactionID"
+LABEL_COLUMN = "Label"
+
+# Transaction columns the preprocessing and both SVMs are fitted on
+FEATURE_COLUMNS = ["Amount", "CountryRisk", "TimeOfDay", "SenderBlacklisted", "SenderAgeDays"]
+
+# Rows per chunk when streaming large files
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def encode_time_of_day(col):
+    if not pd.api.types.is_numeric_dtype(col):
+        return col.map({"Day": 0, "Night": 1}).astype(int)
+    return col.astype(int)
+
+
+def prepare_transactions(df, require_label=True):
+    """Check the expected columns of a raw transaction frame and encode TimeOfDay in place."""
+    expected = [ID_COLUMN] + FEATURE_COLUMNS + [LABEL_COLUMN]
+    if not require_label:
+        expected = expected[:-1]
+    missing = [c for c in expected if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV missing columns: {missing}. Expected: {expected}")
+    df["TimeOfDay"] = encode_time_of_day(df["TimeOfDay"])
+    return df
+
+
+def load_dataset(path, require_label=True):
+    return prepare_transactions(pd.read_csv(path), require_label)
+
+
+def iter_dataset(path, chunk_size=DEFAULT_CHUNK_SIZE, require_label=False):
+    """load_dataset one chunk of chunk_size rows at a time, so memory stays flat for multi-GB files."""
+    with pd.read_csv(path, chunksize=chunk_size) as reader:
+        for chunk in reader:
+            yield prepare_transactions(chunk, require_label)